@@ -0,0 +1,87 @@
+"""Frames of the game, loaded once and kept as ready-to-draw sprites.
+
+Frames are read from the frames/ directory next to this module, so the game
+can be started from any directory. They can also be packed into one bundle
+file, which is memory-mapped on load:
+
+    $ python assets.py frames.bundle
+    $ python space_game.py --assets frames.bundle
+"""
+import mmap
+import os
+import struct
+import sys
+
+from curses_tools import Sprite
+
+FRAMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frames")
+FRAME_EXTENSION = ".txt"
+BUNDLE_MAGIC = b"SGAB"
+BUNDLE_HEADER = struct.Struct("<4sH")
+BUNDLE_ENTRY_HEADER = struct.Struct("<HI")
+
+ASSETS = {}
+
+
+def read_frames_dir(frames_dir):
+    frame_texts = {}
+    for filename in sorted(os.listdir(frames_dir)):
+        name, extension = os.path.splitext(filename)
+        if extension != FRAME_EXTENSION:
+            continue
+        with open(os.path.join(frames_dir, filename), "r") as frame_file:
+            frame_texts[name] = frame_file.read()
+    return frame_texts
+
+
+def pack_bundle(frame_texts, bundle_path):
+    """Write frames to one bundle file: header, then name and text of every frame."""
+    with open(bundle_path, "wb") as bundle_file:
+        bundle_file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, len(frame_texts)))
+        for name, text in frame_texts.items():
+            encoded_name, encoded_text = name.encode(), text.encode()
+            bundle_file.write(BUNDLE_ENTRY_HEADER.pack(len(encoded_name), len(encoded_text)))
+            bundle_file.write(encoded_name)
+            bundle_file.write(encoded_text)
+
+
+def read_bundle(bundle_path):
+    frame_texts = {}
+    with open(bundle_path, "rb") as bundle_file, mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ) as bundle:
+        magic, frames_count = BUNDLE_HEADER.unpack_from(bundle, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"{bundle_path} is not a frames bundle.")
+        offset = BUNDLE_HEADER.size
+        for _ in range(frames_count):
+            name_length, text_length = BUNDLE_ENTRY_HEADER.unpack_from(bundle, offset)
+            offset += BUNDLE_ENTRY_HEADER.size
+            name = bundle[offset:offset + name_length].decode()
+            offset += name_length
+            frame_texts[name] = bundle[offset:offset + text_length].decode()
+            offset += text_length
+    return frame_texts
+
+
+def load_assets(source=FRAMES_DIR):
+    """Load all frames from a directory or a bundle file and compile them into sprites."""
+    if os.path.isdir(source):
+        frame_texts = read_frames_dir(source)
+    else:
+        frame_texts = read_bundle(source)
+
+    ASSETS.clear()
+    ASSETS.update({name: Sprite(text) for name, text in frame_texts.items()})
+    return ASSETS
+
+
+def get_asset(name):
+    """Return sprite of the frame by its file name without extension, e.g. "rocket_frame_1"."""
+    if not ASSETS:
+        load_assets()
+    return ASSETS[name]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python assets.py BUNDLE_PATH")
+    pack_bundle(read_frames_dir(FRAMES_DIR), sys.argv[1])
@@ -0,0 +1,241 @@
+"""Benchmark of the game loop on a virtual canvas.
+
+Runs draw() without pauses for a number of tics for every combination of
+terminal size, garbage spawn delay and number of live bullets, and writes
+p50/p99 tick time, input-to-screen latency, memory blocks allocated per tick,
+peak memory growth within a tick and peak memory to a JSON file. A key the game
+ignores is pressed every tick to measure the latency.
+
+    $ python benchmark.py --tics 500 --output bench.json
+    $ python benchmark.py --compare bench.json
+    $ python benchmark.py --scene late_game.ckpt
+
+A scene is a checkpoint saved in the game with --checkpoint, every case starts
+from it instead of an empty sky.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import space_game
+from entities import spawn_bullet
+from game_scenario import Scenario
+from input_events import InputQueue
+from virtual_canvas import VirtualCanvas
+
+DEFAULT_SIZES = ["40x120", "100x300"]
+DEFAULT_GARBAGE_DELAYS = [20, 6, 2]
+DEFAULT_BULLETS = [0, 10, 50]
+PROBE_KEY_CODE = 0
+ALLOCATION_SAMPLE_TICS = 10
+
+
+class BenchmarkCanvas(VirtualCanvas):
+    """Virtual canvas that treats every refresh() as the end of a game tick."""
+
+    def __init__(self, rows, columns, bullets=0):
+        super().__init__(rows, columns)
+        self.bullets = bullets
+        self.tick_marks = []
+        self.on_tick = None
+
+    def refresh(self):
+        super().refresh()
+        self.tick_marks.append(time.perf_counter())
+        if self.on_tick:
+            self.on_tick()
+        self.keep_bullets_alive()
+        self.push_keys(PROBE_KEY_CODE)
+
+    def keep_bullets_alive(self):
+        if not self.bullets:
+            return
+        space_game.YEAR = max(space_game.YEAR, space_game.SCENARIO.unlocks["fire"])
+        while len(space_game.BULLETS) < self.bullets:
+            column = random.randint(2, self.columns - 3)
+            spawn_bullet(space_game.BULLETS, self.rows - 2, column)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_game(canvas, tics, garbage_delay, seed, scene_path=None):
+    """Play the game on the canvas, return its input queue."""
+    random.seed(seed)
+    scenario = space_game.SCENARIO
+    # the same garbage delay all the game long
+    space_game.SCENARIO = Scenario(
+        scenario.first_year, scenario.last_year, scenario.year_tics,
+        {scenario.first_year: garbage_delay}, scenario.phrases, scenario.unlocks,
+    )
+    space_game.reset_game_state(year=scenario.unlocks["fire"] if canvas.bullets else 1961)
+    if scene_path:
+        space_game.restore_world(scene_path)
+    try:
+        input_queue = InputQueue(canvas.getch)
+        canvas.tick_marks.append(time.perf_counter())
+        space_game.draw(canvas, tics=tics, tick_rate=0, input_queue=input_queue)
+    finally:
+        space_game.SCENARIO = scenario
+    return input_queue
+
+
+def measure_case(rows, columns, garbage_delay, bullets, tics, seed, scene_path=None):
+    canvas = BenchmarkCanvas(rows, columns, bullets)
+    latency = run_game(canvas, tics, garbage_delay, seed, scene_path).get_latency_stats()
+    marks = canvas.tick_marks
+    tick_times_ms = [(end - start) * 1000 for start, end in zip(marks, marks[1:])]
+
+    # second pass under tracemalloc, its overhead would spoil the timings
+    canvas = BenchmarkCanvas(rows, columns, bullets)
+    tick_peak_growths = []
+
+    def record_peak_growth():
+        # peak above the traced memory at the start of the tick, memory freed within the tick is not counted
+        _, tick_peak = tracemalloc.get_traced_memory()
+        tick_peak_growths.append(tick_peak - record_peak_growth.start)
+        tracemalloc.reset_peak()
+        record_peak_growth.start = tracemalloc.get_traced_memory()[0]
+
+    canvas.on_tick = record_peak_growth
+    tracemalloc.start()
+    record_peak_growth.start = 0
+    try:
+        run_game(canvas, tics, garbage_delay, seed, scene_path)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # third pass, snapshots are large and would spoil the peaks
+    canvas = BenchmarkCanvas(rows, columns, bullets)
+    tick_allocated_blocks = []
+    snapshot_filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+    def record_allocated_blocks():
+        # every ALLOCATION_SAMPLE_TICS-th tick is compared with the snapshot taken at its start,
+        # blocks allocated and freed within the tick are not seen
+        record_allocated_blocks.tics += 1
+        if record_allocated_blocks.start_snapshot is not None:
+            snapshot = tracemalloc.take_snapshot().filter_traces(snapshot_filters)
+            differences = snapshot.compare_to(record_allocated_blocks.start_snapshot, "lineno")
+            tick_allocated_blocks.append(sum(max(0, difference.count_diff) for difference in differences))
+            record_allocated_blocks.start_snapshot = None
+        elif not record_allocated_blocks.tics % ALLOCATION_SAMPLE_TICS:
+            record_allocated_blocks.start_snapshot = tracemalloc.take_snapshot().filter_traces(snapshot_filters)
+
+    canvas.on_tick = record_allocated_blocks
+    record_allocated_blocks.tics = 0
+    record_allocated_blocks.start_snapshot = None
+    tracemalloc.start()
+    try:
+        run_game(canvas, tics, garbage_delay, seed, scene_path)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "rows": rows,
+        "columns": columns,
+        "garbage_delay_tics": garbage_delay,
+        "bullets": bullets,
+        "tics": len(tick_times_ms),
+        "stars": int((rows * columns * space_game.SKY_FILLING / 100) // space_game.SYMBOL_AREA),
+        "ticks_per_second": round(1000 / statistics.mean(tick_times_ms), 1),
+        "p50_ms": round(percentile(tick_times_ms, 50), 3),
+        "p99_ms": round(percentile(tick_times_ms, 99), 3),
+        "max_ms": round(max(tick_times_ms), 3),
+        "input_p50_ms": latency["p50_ms"],
+        "input_max_ms": latency["max_ms"],
+        "allocated_blocks_per_tick": round(statistics.mean(tick_allocated_blocks), 1) if tick_allocated_blocks else None,
+        "peak_growth_kib_per_tick": round(statistics.mean(tick_peak_growths) / 1024, 2),
+        "peak_memory_kib": round(peak_memory / 1024, 1),
+        "explosions_peak": space_game.EXPLOSIONS.peak_count,
+    }
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_size(size):
+    rows, columns = size.lower().split("x")
+    return int(rows), int(columns)
+
+
+def compare_results(old_results, new_results):
+    old_cases = {
+        (case["rows"], case["columns"], case["garbage_delay_tics"], case["bullets"]): case
+        for case in old_results["cases"]
+    }
+    for case in new_results["cases"]:
+        key = (case["rows"], case["columns"], case["garbage_delay_tics"], case["bullets"])
+        if key not in old_cases:
+            continue
+        old_case = old_cases[key]
+        print(
+            "{}x{} delay={} bullets={}: p50 {:.3f} -> {:.3f} ms ({:+.0%}), p99 {:.3f} -> {:.3f} ms ({:+.0%})".format(
+                *key,
+                old_case["p50_ms"], case["p50_ms"], case["p50_ms"] / old_case["p50_ms"] - 1,
+                old_case["p99_ms"], case["p99_ms"], case["p99_ms"] / old_case["p99_ms"] - 1,
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the space game loop.")
+    parser.add_argument("--tics", type=int, default=300, help="game loop passes per case")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="terminal sizes as ROWSxCOLUMNS")
+    parser.add_argument("--garbage-delays", nargs="+", type=int, default=DEFAULT_GARBAGE_DELAYS)
+    parser.add_argument("--bullets", nargs="+", type=int, default=DEFAULT_BULLETS, help="live bullets to keep")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scene", help="checkpoint file every case starts from")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results file to compare with")
+    args = parser.parse_args()
+
+    results = {
+        "commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scene": args.scene,
+        "cases": [],
+    }
+    for size in args.sizes:
+        rows, columns = parse_size(size)
+        for garbage_delay in args.garbage_delays:
+            for bullets in args.bullets:
+                case = measure_case(rows, columns, garbage_delay, bullets, args.tics, args.seed, args.scene)
+                results["cases"].append(case)
+                print(
+                    f"{rows}x{columns} delay={garbage_delay} bullets={bullets}: "
+                    f"{case['ticks_per_second']} tps, p50 {case['p50_ms']} ms, p99 {case['p99_ms']} ms, "
+                    f"input p50 {case['input_p50_ms']} ms, "
+                    f"{case['allocated_blocks_per_tick']} blocks/tick, "
+                    f"peak growth {case['peak_growth_kib_per_tick']} KiB/tick, peak {case['peak_memory_kib']} KiB",
+                    file=sys.stderr,
+                )
+
+    with open(args.output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as old_results_file:
+            compare_results(json.load(old_results_file), results)
+
+
+if __name__ == "__main__":
+    main()
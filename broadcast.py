@@ -0,0 +1,305 @@
+"""Show one game on many terminals.
+
+The host plays the game without a terminal and streams every tic to spectators
+connected to a Unix domain socket, each spectator draws the stream in its own
+terminal:
+
+    $ python broadcast.py host /tmp/space_game.sock
+    $ python broadcast.py watch /tmp/space_game.sock
+
+Every frame is a header and runs of cells sharing an attribute. A keyframe has
+runs of the whole screen, a delta only the cells changed since the previous
+tic. The host never waits for a spectator: if one can not take a frame it
+misses the frames until its socket is writable again and then gets a keyframe.
+"""
+import argparse
+import curses
+import os
+import select
+import socket
+import stat
+import struct
+import sys
+from array import array
+
+import space_game
+from input_events import InputQueue
+from renderer import BufferedCanvas, get_changed_runs
+from virtual_canvas import VirtualCanvas, from_code_points, to_code_points
+
+KEYFRAME = 1
+DELTA = 2
+KEYFRAME_INTERVAL = 50
+FRAME_HEADER = struct.Struct("<BIHHI")
+RUN_HEADER = struct.Struct("<HHIH")
+RECEIVE_SIZE = 65536
+QUIT_KEY_CODE = ord("q")
+
+
+def get_screen_runs(chars, attrs, rows, columns):
+    """Yield (row, column, text, attr) runs covering the whole screen."""
+    for row in range(rows):
+        row_start, row_end = row * columns, (row + 1) * columns
+        index = row_start
+        while index < row_end:
+            run_start, attr = index, attrs[index]
+            while index < row_end and attrs[index] == attr:
+                index += 1
+            yield row, run_start - row_start, from_code_points(chars[run_start:index]), attr
+
+
+def encode_frame(kind, tic, rows, columns, runs):
+    payload = bytearray()
+    for row, column, text, attr in runs:
+        text = text.encode("utf-8")
+        payload += RUN_HEADER.pack(row, column, attr, len(text))
+        payload += text
+    return FRAME_HEADER.pack(kind, tic % 2 ** 32, rows, columns, len(payload)) + payload
+
+
+def decode_frames(stream):
+    """Remove complete frames from the stream bytearray, yield (kind, tic, runs) for each of them."""
+    offset = 0
+    while len(stream) - offset >= FRAME_HEADER.size:
+        kind, tic, _, _, payload_size = FRAME_HEADER.unpack_from(stream, offset)
+        payload_end = offset + FRAME_HEADER.size + payload_size
+        if len(stream) < payload_end:
+            break
+
+        runs = []
+        run_offset = offset + FRAME_HEADER.size
+        while run_offset < payload_end:
+            row, column, attr, text_size = RUN_HEADER.unpack_from(stream, run_offset)
+            run_offset += RUN_HEADER.size
+            runs.append((row, column, stream[run_offset:run_offset + text_size].decode("utf-8"), attr))
+            run_offset += text_size
+        offset = payload_end
+        yield kind, tic, runs
+    del stream[:offset]
+
+
+class Spectator:
+    __slots__ = ("connection", "unsent", "needs_keyframe", "sent_frames", "dropped_frames")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.unsent = b""
+        self.needs_keyframe = True
+        self.sent_frames = 0
+        self.dropped_frames = 0
+
+
+class BroadcastServer:
+    """Unix socket server sending every tic to all spectators without blocking.
+
+    A frame that does not fit into the socket buffer is kept and sent first on
+    the next tics, meanwhile new frames are dropped for this spectator only.
+    Deltas are encoded once per tic for everybody.
+    """
+
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL, log=sys.stderr):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.log = log
+        if os.path.exists(path):
+            # a socket left by a finished host is replaced, a served socket or any other file is kept
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise FileExistsError(f"{path} exists and is not a socket.")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(path)
+                except ConnectionRefusedError:
+                    os.unlink(path)
+                else:
+                    raise FileExistsError(f"{path} is served by a running host.")
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.spectators = []
+        self.front_chars = None
+        self.front_attrs = None
+        self.tics_passed = 0
+
+    def accept_spectators(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except BlockingIOError:
+                return
+            connection.setblocking(False)
+            self.spectators.append(Spectator(connection))
+            print(f"spectator joined, {len(self.spectators)} watching", file=self.log)
+
+    def drop_spectator(self, spectator):
+        spectator.connection.close()
+        self.spectators.remove(spectator)
+        print(
+            f"spectator left after {spectator.sent_frames} frames, {spectator.dropped_frames} dropped, "
+            f"{len(self.spectators)} watching",
+            file=self.log,
+        )
+
+    def _send(self, spectator, data):
+        """Send what the socket takes now, keep the rest. Return False when the spectator is gone."""
+        try:
+            sent_size = spectator.connection.send(data)
+        except BlockingIOError:
+            sent_size = 0
+        except OSError:
+            return False
+        spectator.unsent = data[sent_size:]
+        return True
+
+    def broadcast(self, canvas):
+        """Send screen of the tic to every spectator: a delta, or a keyframe to those who need it."""
+        self.accept_spectators()
+        if not self.spectators:
+            # the next spectator starts with a keyframe, no need to follow the changes
+            self.front_chars = self.front_attrs = None
+            self.tics_passed += 1
+            return
+
+        chars, attrs = canvas.chars, canvas.attrs
+        rows, columns = canvas.getmaxyx()
+        if self.front_chars is None:
+            self.front_chars = array("I", chars)
+            self.front_attrs = array("L", attrs)
+            delta = None
+        else:
+            changed_runs = get_changed_runs(chars, attrs, self.front_chars, self.front_attrs, rows, columns)
+            delta = encode_frame(DELTA, self.tics_passed, rows, columns, changed_runs)
+        is_keyframe_tic = not self.tics_passed % self.keyframe_interval
+        keyframe = None
+
+        for spectator in list(self.spectators):
+            if spectator.unsent and not self._send(spectator, spectator.unsent):
+                self.drop_spectator(spectator)
+                continue
+            if spectator.unsent:
+                spectator.dropped_frames += 1
+                spectator.needs_keyframe = True
+                continue
+
+            if spectator.needs_keyframe or is_keyframe_tic or delta is None:
+                if keyframe is None:
+                    keyframe = encode_frame(
+                        KEYFRAME, self.tics_passed, rows, columns, get_screen_runs(chars, attrs, rows, columns)
+                    )
+                frame = keyframe
+                spectator.needs_keyframe = False
+            else:
+                frame = delta
+            if not self._send(spectator, frame):
+                self.drop_spectator(spectator)
+                continue
+            spectator.sent_frames += 1
+
+        self.tics_passed += 1
+
+    def close(self):
+        for spectator in self.spectators:
+            spectator.connection.close()
+        self.listener.close()
+        os.unlink(self.path)
+
+
+class BroadcastCanvas(VirtualCanvas):
+    """Virtual canvas streaming its cells to the spectators on every refresh."""
+
+    def __init__(self, rows, columns, server):
+        super().__init__(rows, columns)
+        self.server = server
+
+    def refresh(self):
+        super().refresh()
+        self.server.broadcast(self)
+
+    def noutrefresh(self):
+        self.refresh()
+
+
+def host(path, rows, columns, tick_rate):
+    """Play the game with nobody at the controls, stream it to spectators until Ctrl+C."""
+    server = BroadcastServer(path)
+    print(f"streaming {rows}x{columns} game to {path}", file=sys.stderr)
+    try:
+        space_game.draw(
+            BroadcastCanvas(rows, columns, server), tick_rate=tick_rate, input_queue=InputQueue(lambda: -1)
+        )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+def apply_runs(canvas, runs):
+    """Write runs to the back buffer of the canvas, the parts out of the window are cut off."""
+    rows, columns = canvas.getmaxyx()
+    for row, column, text, attr in runs:
+        if row >= rows or column >= columns:
+            continue
+        text = text[:columns - column]
+        index = row * columns + column
+        canvas.chars[index:index + len(text)] = to_code_points(text)
+        canvas.attrs[index:index + len(text)] = array("L", [attr]) * len(text)
+
+
+def watch(window, path):
+    """Draw the stream of the host in curses window until it ends or q is pressed."""
+    canvas = BufferedCanvas(window)
+    canvas.nodelay(True)
+    curses.curs_set(False)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(path)
+    stream = bytearray()
+    has_keyframe = False
+
+    with connection:
+        while True:
+            readable, _, _ = select.select([connection, canvas.input_fileno], [], [])
+            if canvas.input_fileno in readable and canvas.getch() == QUIT_KEY_CODE:
+                return
+            if connection not in readable:
+                continue
+
+            data = connection.recv(RECEIVE_SIZE)
+            if not data:
+                return
+            stream += data
+            is_changed = False
+            for kind, _, runs in decode_frames(stream):
+                # deltas make sense only on top of a keyframe, the first ones or after dropped frames are skipped
+                if kind == KEYFRAME:
+                    has_keyframe = True
+                if has_keyframe:
+                    apply_runs(canvas, runs)
+                    is_changed = True
+            if is_changed:
+                canvas.refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream one space game to many terminals.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    host_parser = subparsers.add_parser("host", help="play the game without terminal and stream it")
+    host_parser.add_argument("socket_path")
+    host_parser.add_argument("--rows", type=int, default=40)
+    host_parser.add_argument("--columns", type=int, default=120)
+    host_parser.add_argument("--tick-rate", type=int, default=space_game.TICK_RATE)
+    watch_parser = subparsers.add_parser("watch", help="show the stream of a host, q to quit")
+    watch_parser.add_argument("socket_path")
+    args = parser.parse_args()
+
+    if args.mode == "host":
+        try:
+            host(args.socket_path, args.rows, args.columns, args.tick_rate)
+        except FileExistsError as error:
+            parser.error(str(error))
+    else:
+        curses.update_lines_cols()
+        curses.wrapper(watch, args.socket_path)
+
+
+if __name__ == "__main__":
+    main()
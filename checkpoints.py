@@ -0,0 +1,165 @@
+"""Binary checkpoint of the whole game world, written and read in milliseconds.
+
+Positions, speeds and ages of all entities are the arrays of their stores,
+they are written and read as raw bytes without a per-entity loop. Sprites are
+stored by their frame names, ids given in this process may differ.
+
+Layout, little-endian:
+    header      — magic b"SGCP", format version (H), year (i), game over (B), rows (H), columns (H),
+                  ship row (d), ship column (d), next obstacle uid (Q)
+    RNG         — version (B), has gauss (B), gauss (d), internal state (array of I)
+    sprites     — number of names (H), then length (H) and UTF-8 name of every sprite id
+    stars       — tics passed (Q), rows (H), columns (H), symbols (I), blink offsets (q), attributes (q)
+    garbage     — rows (d), columns (d), row speeds (d), column speeds (d), sprite ids (H), states (B),
+                  ages (q), obstacle uids (q)
+    bullets     — the same as garbage
+    explosions  — rows (d), columns (d), ages (H) in spawn order
+    collisions  — uids of obstacles hit in the last tic (q)
+Every array is its length (I) followed by its items.
+"""
+import struct
+import sys
+from array import array
+
+from entities import DEAD, EntityStore
+from explosion import ExplosionPool
+from star_field import StarField
+
+CHECKPOINT_MAGIC = b"SGCP"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct("<4sHiBHHddQ")
+RNG_HEADER = struct.Struct("<BBd")
+NAMES_COUNT = struct.Struct("<H")
+NAME_LENGTH = struct.Struct("<H")
+STARS_HEADER = struct.Struct("<Q")
+ARRAY_LENGTH = struct.Struct("<I")
+# typecodes of the arrays as they are stored, "L" of the stores is 4 or 8 bytes depending on the platform
+STAR_TYPECODES = "HHIqq"
+ENTITY_TYPECODES = "ddddHBqq"
+EXPLOSION_TYPECODES = "ddH"
+
+
+def pack_array(values, typecode):
+    values = array(typecode, values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return ARRAY_LENGTH.pack(len(values)) + values.tobytes()
+
+
+def unpack_array(content, offset, typecode):
+    """Return array read at offset and offset after it."""
+    (length,) = ARRAY_LENGTH.unpack_from(content, offset)
+    offset += ARRAY_LENGTH.size
+    values = array(typecode)
+    values.frombytes(content[offset:offset + length * values.itemsize])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, offset + length * values.itemsize
+
+
+def write_checkpoint(path, world):
+    """Write world dict with the keys returned by read_checkpoint() to a checkpoint file."""
+    rng_version, rng_internal_state, gauss = world["rng_state"]
+    chunks = [
+        CHECKPOINT_HEADER.pack(
+            CHECKPOINT_MAGIC, CHECKPOINT_VERSION, world["year"], world["game_over"], world["rows"],
+            world["columns"], world["ship_row"], world["ship_column"], world["next_uid"],
+        ),
+        RNG_HEADER.pack(rng_version, gauss is not None, gauss or 0),
+        pack_array(rng_internal_state, "I"),
+        NAMES_COUNT.pack(len(world["sprite_names"])),
+    ]
+    for name in world["sprite_names"]:
+        encoded_name = name.encode()
+        chunks += [NAME_LENGTH.pack(len(encoded_name)), encoded_name]
+
+    star_field = world["star_field"]
+    chunks.append(STARS_HEADER.pack(star_field.tics_passed))
+    for column, typecode in zip(star_field.get_arrays(), STAR_TYPECODES):
+        chunks.append(pack_array(column, typecode))
+    for store in (world["garbage"], world["bullets"]):
+        chunks += [pack_array(column, typecode) for column, typecode in zip(store.get_arrays(), ENTITY_TYPECODES)]
+
+    explosions = world["explosions"]
+    busy_slots = explosions.busy_slots
+    chunks += [
+        pack_array([explosions.rows[slot] for slot in busy_slots], "d"),
+        pack_array([explosions.columns[slot] for slot in busy_slots], "d"),
+        pack_array([explosions.ages[slot] for slot in busy_slots], "H"),
+        pack_array(sorted(world["collided_uids"]), "q"),
+    ]
+
+    with open(path, "wb") as checkpoint_file:
+        checkpoint_file.write(b"".join(chunks))
+
+
+def read_checkpoint(path):
+    """Return dict with year, game_over, rows, columns, ship_row, ship_column, next_uid, rng_state,
+    sprite_names, star_field, garbage, bullets, explosions and collided_uids read from a checkpoint file.
+    """
+    with open(path, "rb") as checkpoint_file:
+        content = checkpoint_file.read()
+
+    if len(content) < CHECKPOINT_HEADER.size:
+        raise ValueError(f"{path} is not a checkpoint of version {CHECKPOINT_VERSION}.")
+    magic, version, *header = CHECKPOINT_HEADER.unpack_from(content, 0)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not a checkpoint of version {CHECKPOINT_VERSION}.")
+    year, game_over, rows, columns, ship_row, ship_column, next_uid = header
+    offset = CHECKPOINT_HEADER.size
+
+    rng_version, has_gauss, gauss = RNG_HEADER.unpack_from(content, offset)
+    rng_internal_state, offset = unpack_array(content, offset + RNG_HEADER.size, "I")
+
+    (names_count,) = NAMES_COUNT.unpack_from(content, offset)
+    offset += NAMES_COUNT.size
+    sprite_names = []
+    for _ in range(names_count):
+        (name_length,) = NAME_LENGTH.unpack_from(content, offset)
+        offset += NAME_LENGTH.size
+        sprite_names.append(content[offset:offset + name_length].decode())
+        offset += name_length
+
+    star_field = StarField()
+    (star_field.tics_passed,) = STARS_HEADER.unpack_from(content, offset)
+    offset += STARS_HEADER.size
+    for column, typecode in zip(star_field.get_arrays(), STAR_TYPECODES):
+        values, offset = unpack_array(content, offset, typecode)
+        column[:] = array(column.typecode, values)
+    star_field.group_by_phase()
+
+    garbage, bullets = EntityStore(), EntityStore()
+    for store in (garbage, bullets):
+        for column, typecode in zip(store.get_arrays(), ENTITY_TYPECODES):
+            values, offset = unpack_array(content, offset, typecode)
+            column[:] = array(column.typecode, values)
+        store.dead_count = store.states.count(DEAD)
+
+    explosion_arrays = []
+    for typecode in EXPLOSION_TYPECODES:
+        values, offset = unpack_array(content, offset, typecode)
+        explosion_arrays.append(values)
+    explosions = ExplosionPool()
+    for row, column, age in zip(*explosion_arrays):
+        slot = explosions.spawn(row, column)
+        if slot is not None:
+            explosions.ages[slot] = age
+
+    collided_uids, offset = unpack_array(content, offset, "q")
+
+    return {
+        "year": year,
+        "game_over": bool(game_over),
+        "rows": rows,
+        "columns": columns,
+        "ship_row": ship_row,
+        "ship_column": ship_column,
+        "next_uid": next_uid,
+        "rng_state": (rng_version, tuple(rng_internal_state), gauss if has_gauss else None),
+        "sprite_names": sprite_names,
+        "star_field": star_field,
+        "garbage": garbage,
+        "bullets": bullets,
+        "explosions": explosions,
+        "collided_uids": set(collided_uids),
+    }
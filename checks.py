@@ -0,0 +1,267 @@
+"""Scripted checks of the parts of the game that break without a visible sign.
+
+Not a test suite: every check feeds random input to the fast code path and to
+a plain one that is easy to trust, and prints every difference. The script
+exits with status 1 when any check fails.
+
+    $ python checks.py
+    $ python checks.py collisions --seed 7
+    $ python checks.py session-log
+    $ python checks.py checkpoint
+    $ python checks.py acceleration
+"""
+import argparse
+import curses
+import os
+import random
+import sys
+import tempfile
+
+import replay
+import space_game
+from curses_tools import DOWN_KEY_CODE, LEFT_KEY_CODE, RIGHT_KEY_CODE, SPACE_KEY_CODE, UP_KEY_CODE
+from input_events import InputQueue
+from obstacles import Boxes, Obstacle, ObstacleIndex, find_collisions
+from physics import ACCELERATION_TOLERANCE, _apply_acceleration, update_speeds
+from session_log import MAX_KEYS_IN_RECORD, RecordingInputQueue, SessionRecorder, read_session
+from virtual_canvas import VirtualCanvas
+
+COLLISION_ROUNDS = 500
+MAX_BOXES = 15
+LOG_TICS = 500
+SESSION_TICS = 400
+SESSION_SIZE = (40, 120)
+SESSION_RESIZES = {100: (20, 50), 200: (60, 200), 300: (16, 30)}
+SESSION_KEYS = [UP_KEY_CODE, DOWN_KEY_CODE, LEFT_KEY_CODE, RIGHT_KEY_CODE, SPACE_KEY_CODE]
+KEY_PRESS_CHANCE = 0.5
+CHECKPOINT_TICS = 300
+RESUMED_TICS = 100
+ACCELERATION_BODIES = 20000
+REPORTED_FAILURES = 5
+
+
+class SessionCanvas(VirtualCanvas):
+    """Virtual canvas pressing random keys and resizing the terminal at the end of some tics."""
+
+    def __init__(self, rows, columns, seed):
+        super().__init__(rows, columns)
+        self.random = random.Random(seed)
+        self.tics_passed = 0
+
+    def refresh(self):
+        super().refresh()
+        self.tics_passed += 1
+        if self.tics_passed in SESSION_RESIZES:
+            self.set_terminal_size(*SESSION_RESIZES[self.tics_passed])
+            self.push_keys(curses.KEY_RESIZE)
+        if self.random.random() < KEY_PRESS_CHANCE:
+            self.push_keys(self.random.choice(SESSION_KEYS))
+
+
+def get_random_boxes(rng, is_integer):
+    """Return list of (row, column, rows_size, columns_size) boxes, zero sizes and edges touching included."""
+    coordinate = rng.randint if is_integer else rng.uniform
+    return [
+        (coordinate(-5, 40), coordinate(-5, 40), rng.choice([0, 1, 2, 3, 5.5]), rng.choice([0, 1, 2, 4]))
+        for _ in range(rng.randint(0, MAX_BOXES))
+    ]
+
+
+def find_collisions_brute_force(obstacle_boxes, probe_boxes):
+    """Intersect every pair of boxes, return sorted list of (obstacle_index, probe_index) like find_collisions."""
+    return sorted(
+        (obstacle_index, probe_index)
+        for obstacle_index, (row, column, rows_size, columns_size) in enumerate(obstacle_boxes)
+        for probe_index, (probe_row, probe_column, probe_rows_size, probe_columns_size) in enumerate(probe_boxes)
+        if max(row, probe_row) < min(row + rows_size, probe_row + probe_rows_size)
+        and max(column, probe_column) < min(column + columns_size, probe_column + probe_columns_size)
+    )
+
+
+def check_collisions(seed):
+    """Compare find_collisions and ObstacleIndex.query_boxes with the brute force on random boxes."""
+    rng = random.Random(seed)
+    failures = []
+    for round_index in range(COLLISION_ROUNDS):
+        # bullets are probes at whole cells, garbage moves by fractions but starts at whole cells
+        obstacle_boxes = get_random_boxes(rng, is_integer=round_index % 2 == 0)
+        probe_boxes = get_random_boxes(rng, is_integer=True)
+        expected = find_collisions_brute_force(obstacle_boxes, probe_boxes)
+
+        swept = find_collisions(Boxes(obstacle_boxes), Boxes(probe_boxes))
+        if swept != expected:
+            failures.append(f"round {round_index}: find_collisions gave {swept}, brute force {expected}")
+
+        index = ObstacleIndex()
+        for box in obstacle_boxes:
+            index.insert(Obstacle(*box))
+        queried = index.query_boxes(Boxes(probe_boxes))
+        if queried != expected:
+            failures.append(f"round {round_index}: query_boxes gave {queried}, brute force {expected}")
+    return failures
+
+
+def check_session_log(seed):
+    """Read back a log of random keys and sizes, then replay a recorded game with resizes to the same state."""
+    rng = random.Random(seed)
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "format.log")
+        recorder = SessionRecorder(log_path, seed, *SESSION_SIZE)
+        keys_by_tic, sizes_by_tic = {}, {}
+        for tic in range(LOG_TICS):
+            # long bursts take several records of one tic
+            keys_count = rng.choice([0, 0, 1, 3, MAX_KEYS_IN_RECORD, 2 * MAX_KEYS_IN_RECORD + 1])
+            key_codes = [rng.randrange(2 ** 16) for _ in range(keys_count)]
+            terminal_size = (rng.randrange(1, 2 ** 16), rng.randrange(1, 2 ** 16)) if rng.random() < 0.1 else None
+            recorder.record_tic(key_codes, terminal_size)
+            if key_codes:
+                keys_by_tic[tic] = key_codes
+            if terminal_size:
+                sizes_by_tic[tic] = terminal_size
+        recorder.close()
+        expected = {
+            "seed": seed,
+            "rows": SESSION_SIZE[0],
+            "columns": SESSION_SIZE[1],
+            "tics": LOG_TICS,
+            "keys_by_tic": keys_by_tic,
+            "sizes_by_tic": sizes_by_tic,
+        }
+        session = read_session(log_path)
+        for name, value in expected.items():
+            if session[name] != value:
+                failures.append(f"{name} read back differs from the recorded one")
+
+        session_path = os.path.join(directory, "session.log")
+        space_game.reset_game_state()
+        random.seed(seed)
+        canvas = SessionCanvas(*SESSION_SIZE, seed)
+        recorder = SessionRecorder(session_path, seed, *SESSION_SIZE)
+        input_queue = RecordingInputQueue(canvas.getch, None, recorder, lambda: canvas.terminal_size)
+        try:
+            space_game.draw(canvas, tics=SESSION_TICS, tick_rate=0, input_queue=input_queue)
+        finally:
+            recorder.close()
+        played_digest = replay.get_state_digest()
+        replay.replay_session(read_session(session_path))
+        replayed_digest = replay.get_state_digest()
+        if replayed_digest != played_digest:
+            failures.append(f"replay ended in state {replayed_digest}, the recorded game in {played_digest}")
+    return failures
+
+
+def get_world_state():
+    """Return copy of the game world as plain values, explosions in their order whatever pool slots they take."""
+    explosions = space_game.EXPLOSIONS
+    return (
+        space_game.YEAR,
+        space_game.GAME_OVER,
+        random.getstate(),
+        space_game.SHIP_ROW,
+        space_game.SHIP_COLUMN,
+        [list(column) for column in space_game.GARBAGE.get_arrays()],
+        [list(column) for column in space_game.BULLETS.get_arrays()],
+        [(explosions.rows[slot], explosions.columns[slot], explosions.ages[slot]) for slot in explosions.busy_slots],
+        space_game.OBSTACLES.next_uid,
+        sorted(
+            (obstacle.uid, obstacle.row, obstacle.column, obstacle.rows_size, obstacle.columns_size)
+            for obstacle in space_game.OBSTACLES
+        ),
+        sorted(space_game.OBSTACLES_IN_LAST_COLLISIONS),
+        space_game.STAR_FIELD.tics_passed,
+        [list(column) for column in space_game.STAR_FIELD.get_arrays()],
+    )
+
+
+def check_checkpoint(seed):
+    """Save a game with shots and explosions, restore it, save it again and play the restored game twice."""
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint_path = os.path.join(directory, "world.ckpt")
+        resaved_path = os.path.join(directory, "resaved.ckpt")
+        space_game.reset_game_state(space_game.SCENARIO.unlocks["fire"])
+        random.seed(seed)
+        canvas = SessionCanvas(*SESSION_SIZE, seed)
+        space_game.draw(canvas, tics=CHECKPOINT_TICS, tick_rate=0, input_queue=InputQueue(canvas.getch))
+        saved_state = get_world_state()
+        space_game.save_world(checkpoint_path, canvas)
+
+        space_game.reset_game_state()
+        world = space_game.restore_world(checkpoint_path)
+        if get_world_state() != saved_state:
+            failures.append("restored world differs from the saved one")
+        space_game.save_world(resaved_path, VirtualCanvas(world["rows"], world["columns"]))
+        with open(checkpoint_path, "rb") as checkpoint_file, open(resaved_path, "rb") as resaved_file:
+            if checkpoint_file.read() != resaved_file.read():
+                failures.append("checkpoint saved again after restoring differs from the first one")
+
+        resumed_states = []
+        for _ in range(2):
+            world = space_game.restore_world(checkpoint_path)
+            canvas = VirtualCanvas(world["rows"], world["columns"])
+            space_game.draw(canvas, tics=RESUMED_TICS, tick_rate=0, input_queue=InputQueue(lambda: -1))
+            resumed_states.append(get_world_state())
+        if resumed_states[0] != resumed_states[1]:
+            failures.append("two games resumed from one checkpoint went apart")
+    return failures
+
+
+def check_acceleration(seed):
+    """Compare the table-driven update_speeds with the math.cos formula of _apply_acceleration on random speeds."""
+    rng = random.Random(seed)
+    speed_limit = rng.choice([0.5, 1, 2, 3])
+    fading = rng.uniform(0, 1)
+    speeds = [rng.uniform(-speed_limit, speed_limit) for _ in range(ACCELERATION_BODIES)]
+    directions = [rng.choice([-1, 0, 1]) for _ in range(ACCELERATION_BODIES)]
+    updated_speeds, _ = update_speeds(list(speeds), [], directions, [], speed_limit, speed_limit, fading)
+
+    failures = []
+    for speed, direction, updated_speed in zip(speeds, directions, updated_speeds):
+        expected_speed = speed * fading
+        if direction:
+            expected_speed = _apply_acceleration(expected_speed, speed_limit, forward=direction > 0)
+        # near the stop threshold the two may round to opposite sides of it
+        if abs(abs(expected_speed) - 0.1) < ACCELERATION_TOLERANCE:
+            continue
+        if abs(updated_speed - expected_speed) >= ACCELERATION_TOLERANCE:
+            failures.append(
+                f"speed {speed} direction {direction} limit {speed_limit} fading {fading}: "
+                f"update_speeds gave {updated_speed}, math.cos {expected_speed}"
+            )
+    return failures
+
+
+CHECKS = {
+    "collisions": check_collisions,
+    "session-log": check_session_log,
+    "checkpoint": check_checkpoint,
+    "acceleration": check_acceleration,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the fast paths of the space game against plain ones.")
+    parser.add_argument("checks", nargs="*", help=f"checks to run, all by default: {', '.join(CHECKS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    unknown_checks = [name for name in args.checks if name not in CHECKS]
+    if unknown_checks:
+        parser.error(f"unknown checks: {', '.join(unknown_checks)}")
+
+    failed_checks = []
+    for name in args.checks or CHECKS:
+        failures = CHECKS[name](args.seed)
+        if not failures:
+            print(f"{name}: ok")
+            continue
+        failed_checks.append(name)
+        print(f"{name}: {len(failures)} failures")
+        for failure in failures[:REPORTED_FAILURES]:
+            print(f"    {failure}")
+    if failed_checks:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,161 @@
+import curses
+
 SPACE_KEY_CODE = 32
 LEFT_KEY_CODE = 260
 RIGHT_KEY_CODE = 261
 UP_KEY_CODE = 259
 DOWN_KEY_CODE = 258
+PROFILER_KEY_CODE = 112
+CHECKPOINT_KEY_CODE = 115
 
+BEEPS_COUNT = 0
+IS_BELL_REQUESTED = False
 
-def read_controls(canvas):
-    """Read keys pressed and returns tuple witl controls state."""
 
-    rows_direction = columns_direction = 0
-    space_pressed = False
+def beep():
+    """Ask for terminal bell, it rings once in ring_bell() however many times it was asked for in a tic."""
+    global IS_BELL_REQUESTED
+    IS_BELL_REQUESTED = True
 
-    while True:
-        pressed_key_code = canvas.getch()
 
-        if pressed_key_code == -1:
-            # https://docs.python.org/3/library/curses.html#curses.window.getch
-            break
+def ring_bell():
+    """Ring terminal bell if it was asked for, do nothing when there is no terminal (e.g. virtual canvas).
 
-        if pressed_key_code == UP_KEY_CODE:
-            rows_direction = -1
+    All the rings are counted, so a process without terminal can pass them to one with it.
+    """
+    global BEEPS_COUNT, IS_BELL_REQUESTED
+    if not IS_BELL_REQUESTED:
+        return
+    IS_BELL_REQUESTED = False
+    BEEPS_COUNT += 1
+    try:
+        curses.beep()
+    except curses.error:
+        pass
 
-        if pressed_key_code == DOWN_KEY_CODE:
-            rows_direction = 1
 
-        if pressed_key_code == RIGHT_KEY_CODE:
-            columns_direction = 1
+def read_key_controls(pressed_key_code):
+    """Return controls state for one pressed key."""
 
-        if pressed_key_code == LEFT_KEY_CODE:
-            columns_direction = -1
+    rows_direction = columns_direction = 0
+    space_pressed = False
 
-        if pressed_key_code == SPACE_KEY_CODE:
-            space_pressed = True
+    if pressed_key_code == UP_KEY_CODE:
+        rows_direction = -1
 
-    return rows_direction, columns_direction, space_pressed
+    if pressed_key_code == DOWN_KEY_CODE:
+        rows_direction = 1
 
+    if pressed_key_code == RIGHT_KEY_CODE:
+        columns_direction = 1
 
-def draw_frame(canvas, start_row, start_column, text, negative=False):
-    """Draw multiline text fragment on canvas, erase text instead of drawing if negative=True is specified."""
+    if pressed_key_code == LEFT_KEY_CODE:
+        columns_direction = -1
 
-    rows_number, columns_number = canvas.getmaxyx()
+    if pressed_key_code == SPACE_KEY_CODE:
+        space_pressed = True
 
-    for row, line in enumerate(text.splitlines(), round(start_row)):
-        if row < 0:
-            continue
+    return rows_direction, columns_direction, space_pressed
 
-        if row >= rows_number:
-            break
 
-        for column, symbol in enumerate(line, round(start_column)):
-            if column < 0:
+class Sprite:
+    """Multiline text fragment parsed once, ready to be drawn many times.
+
+    Keeps the size of the fragment, its non-space cells and horizontal runs of
+    consecutive non-space characters. Runs are written with one addstr call each.
+    Collision mask has one integer per row, bit N is set when column N is not a space.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        lines = text.splitlines()
+        self.rows = len(lines)
+        self.columns = max([len(line) for line in lines])
+        self.size = self.rows, self.columns
+        self.cells = [
+            (row, column, symbol)
+            for row, line in enumerate(lines)
+            for column, symbol in enumerate(line)
+            if symbol != " "
+        ]
+        self.runs = []
+        for row, line in enumerate(lines):
+            for column, symbol in enumerate(line):
+                if symbol == " ":
+                    continue
+                if column and line[column - 1] != " ":
+                    run_row, run_column, run_text = self.runs[-1]
+                    self.runs[-1] = (run_row, run_column, run_text + symbol)
+                else:
+                    self.runs.append((row, column, symbol))
+        self.mask = tuple(
+            sum(1 << column for column, symbol in enumerate(line) if symbol != " ")
+            for line in lines
+        )
+
+    def __repr__(self):
+        return f"Sprite({self.text!r})"
+
+    def draw(self, canvas, start_row, start_column, negative=False):
+        """Draw sprite on canvas clipped by window borders, erase it instead if negative=True is specified."""
+
+        rows_number, columns_number = canvas.getmaxyx()
+        start_row, start_column = round(start_row), round(start_column)
+
+        if start_row >= rows_number or start_column >= columns_number:
+            return
+        if start_row + self.rows <= 0 or start_column + self.columns <= 0:
+            return
+
+        for run_row, run_column, run_text in self.runs:
+            row = start_row + run_row
+            if row < 0:
                 continue
-
-            if column >= columns_number:
+            if row >= rows_number:
                 break
 
-            if symbol == " ":
+            column = start_column + run_column
+            if column >= columns_number:
                 continue
+            if column < 0:
+                run_text = run_text[-column:]
+                column = 0
+            if column + len(run_text) > columns_number:
+                run_text = run_text[:columns_number - column]
 
-            # Check that current position it is not in a lower right corner of the window
-            # Curses will raise exception in that case. Don`t ask why…
+            # Curses raises exception after writing to a lower right corner of the window
             # https://docs.python.org/3/library/curses.html#curses.window.addch
-            if row == rows_number - 1 and column == columns_number - 1:
+            if row == rows_number - 1 and column + len(run_text) == columns_number:
+                run_text = run_text[:-1]
+
+            if not run_text:
                 continue
+            canvas.addstr(row, column, run_text if not negative else " " * len(run_text))
+
+    def erase(self, canvas, start_row, start_column):
+        self.draw(canvas, start_row, start_column, negative=True)
+
+
+def get_sprite(frame):
+    """Return Sprite for a text fragment, sprites are returned as is."""
+    if isinstance(frame, Sprite):
+        return frame
+    return Sprite(frame)
+
+
+def draw_frame(canvas, start_row, start_column, frame, negative=False):
+    """Draw multiline text fragment or Sprite on canvas, erase it instead of drawing if negative=True is specified."""
+
+    get_sprite(frame).draw(canvas, start_row, start_column, negative)
+
 
-            symbol = symbol if not negative else " "
-            canvas.addch(row, column, symbol)
+def get_frame_size(frame):
+    """Calculate size of multiline text fragment or Sprite, return pair — number of rows and colums."""
 
+    return get_sprite(frame).size
 
-def get_frame_size(text):
-    """Calculate size of multiline text fragment, return pair — number of rows and colums."""
 
-    lines = text.splitlines()
-    rows = len(lines)
-    columns = max([len(line) for line in lines])
-    return rows, columns
+def get_frame_max_size(frames):
+    frames_sizes = [get_frame_size(frame) for frame in frames]
+    frame_max_size = max(frames_sizes, key=max)
+    return frame_max_size
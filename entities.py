@@ -0,0 +1,223 @@
+"""Entities of the game kept as columns of arrays and the systems updating them.
+
+One EntityStore holds one kind of entities: garbage, bullets or explosions.
+Every tic each system walks its whole store once and does movement,
+collisions and expiry for all entities of the kind together.
+"""
+from array import array
+
+from curses_tools import Sprite, beep, draw_frame
+from explosion import spawn_explosion
+from obstacles import Boxes, Obstacle, has_mask_collision
+from physics import update_speeds
+
+ALIVE = 0
+DEAD = 1
+
+NO_UID = -1
+GARBAGE_SPEED = 0.5
+BULLET_ROWS_SPEED = -0.3
+BULLET_SPRITE = Sprite("|")
+
+SPRITES = []
+_SPRITE_IDS = {}
+
+
+def register_sprite(sprite):
+    """Return id of the sprite, ids are indexes in SPRITES and are given once per sprite."""
+    if id(sprite) not in _SPRITE_IDS:
+        _SPRITE_IDS[id(sprite)] = len(SPRITES)
+        SPRITES.append(sprite)
+    return _SPRITE_IDS[id(sprite)]
+
+
+class EntityStore:
+    """Entities of one kind as parallel arrays, index in the arrays is the entity.
+
+    Dead entities stay in place until compact() drops them, so indexes are
+    stable during a system pass.
+    """
+
+    def __init__(self):
+        self.rows = array("d")
+        self.columns = array("d")
+        self.rows_speeds = array("d")
+        self.columns_speeds = array("d")
+        self.sprite_ids = array("H")
+        self.states = array("B")
+        self.ages = array("L")
+        self.uids = array("q")
+        self.dead_count = 0
+
+    def get_arrays(self):
+        return (
+            self.rows, self.columns, self.rows_speeds, self.columns_speeds,
+            self.sprite_ids, self.states, self.ages, self.uids,
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+    def spawn(self, row, column, rows_speed=0, columns_speed=0, sprite_id=0, uid=NO_UID):
+        self.rows.append(row)
+        self.columns.append(column)
+        self.rows_speeds.append(rows_speed)
+        self.columns_speeds.append(columns_speed)
+        self.sprite_ids.append(sprite_id)
+        self.states.append(ALIVE)
+        self.ages.append(0)
+        self.uids.append(uid)
+        return len(self.rows) - 1
+
+    def kill(self, index):
+        if self.states[index] != DEAD:
+            self.states[index] = DEAD
+            self.dead_count += 1
+
+    def compact(self):
+        """Drop dead entities keeping the order of the alive ones."""
+        if not self.dead_count:
+            return
+        states = self.states
+        alive = [index for index in range(len(states)) if states[index] == ALIVE]
+        for column in self.get_arrays():
+            column[:] = array(column.typecode, [column[index] for index in alive])
+        self.dead_count = 0
+
+    def clear(self):
+        for column in self.get_arrays():
+            del column[:]
+        self.dead_count = 0
+
+
+def apply_inertia(store, rows_directions=0, columns_directions=0, row_speed_limit=2, column_speed_limit=2, fading=0.8):
+    """Accelerate or slow down all entities of the store with the ship inertia model in one call."""
+    update_speeds(
+        store.rows_speeds, store.columns_speeds, rows_directions, columns_directions,
+        row_speed_limit, column_speed_limit, fading,
+    )
+
+
+def spawn_garbage(garbage, obstacles, column, sprite, columns_number, speed=GARBAGE_SPEED):
+    """Add garbage piece at the top of the window, it flies down keeping its column."""
+    column = max(column, 0)
+    column = min(column, columns_number - 1)
+    uid = obstacles.insert(Obstacle(0, column, sprite.rows, sprite.columns, sprite=sprite))
+    return garbage.spawn(0, column, speed, 0, register_sprite(sprite), uid)
+
+
+def update_garbage(canvas, garbage, obstacles, collided_uids, explosions):
+    """Move all garbage one tic down, blow up shot pieces. Return number of pieces gone off the window."""
+    rows_number, _ = canvas.getmaxyx()
+    rows, columns, rows_speeds, sprite_ids, ages, uids = (
+        garbage.rows, garbage.columns, garbage.rows_speeds, garbage.sprite_ids, garbage.ages, garbage.uids,
+    )
+    gone_count = 0
+
+    for index in range(len(garbage)):
+        sprite = SPRITES[sprite_ids[index]]
+        row, column, uid = rows[index], columns[index], uids[index]
+
+        if ages[index]:
+            if uid in collided_uids:
+                collided_uids.discard(uid)
+                obstacles.remove(uid)
+                draw_frame(canvas, row, column, sprite, negative=True)
+                spawn_explosion(explosions, row, column)
+                garbage.kill(index)
+                continue
+
+            draw_frame(canvas, row, column, sprite, negative=True)
+            row += rows_speeds[index]
+            rows[index] = row
+            if row >= rows_number:
+                obstacles.remove(uid)
+                garbage.kill(index)
+                gone_count += 1
+                continue
+
+        draw_frame(canvas, row, column, sprite)
+        obstacles.move(uid, row, column)
+        ages[index] += 1
+
+    garbage.compact()
+    return gone_count
+
+
+def clamp_garbage(canvas, garbage, obstacles, max_column):
+    """Move pieces that are right of max_column to it, e.g. when the window gets narrower."""
+    rows, columns, sprite_ids, uids = garbage.rows, garbage.columns, garbage.sprite_ids, garbage.uids
+    for index in range(len(garbage)):
+        if columns[index] <= max_column:
+            continue
+        draw_frame(canvas, rows[index], columns[index], SPRITES[sprite_ids[index]], negative=True)
+        columns[index] = max_column
+        obstacles.move(uids[index], rows[index], max_column)
+
+
+def kill_outside(store, rows_number, columns_number):
+    """Drop entities which positions are out of the window."""
+    rows, columns = store.rows, store.columns
+    for index in range(len(store)):
+        if not (0 <= round(rows[index]) < rows_number and 0 <= round(columns[index]) < columns_number):
+            store.kill(index)
+    store.compact()
+
+
+def spawn_bullet(bullets, row, column, rows_speed=BULLET_ROWS_SPEED, columns_speed=0):
+    return bullets.spawn(row, column, rows_speed, columns_speed, register_sprite(BULLET_SPRITE))
+
+
+def update_bullets(canvas, bullets, obstacles, collided_uids):
+    """Move all bullets, then check all of them for hits with one batched collision query.
+
+    A new bullet shows a flash for two tics and then flies until it leaves the window or hits an obstacle.
+    """
+    window_rows, window_columns = canvas.getmaxyx()
+    max_row, max_column = window_rows - 1, window_columns - 1
+    rows, columns, rows_speeds, columns_speeds, ages = (
+        bullets.rows, bullets.columns, bullets.rows_speeds, bullets.columns_speeds, bullets.ages,
+    )
+    probes = Boxes()
+    probe_indexes = []
+
+    for index in range(len(bullets)):
+        row, column, age = rows[index], columns[index], ages[index]
+        ages[index] = age + 1
+
+        if age == 0:
+            canvas.addstr(round(row), round(column), "*")
+            continue
+        if age == 1:
+            canvas.addstr(round(row), round(column), "O")
+            continue
+
+        canvas.addstr(round(row), round(column), " ")
+        row += rows_speeds[index]
+        column += columns_speeds[index]
+        rows[index], columns[index] = row, column
+        if age == 2:
+            beep()
+
+        if not (0 < row < max_row and 0 < column < max_column):
+            bullets.kill(index)
+            continue
+
+        canvas.addstr(round(row), round(column), "-" if columns_speeds[index] else "|")
+        probes.append(round(row), round(column))
+        probe_indexes.append(index)
+
+    for uid, probe_index in obstacles.query_boxes(probes):
+        index = probe_indexes[probe_index]
+        if bullets.states[index] == DEAD:
+            continue
+        obstacle = obstacles.obstacles[uid]
+        if obstacle.sprite and not has_mask_collision(
+            BULLET_SPRITE, rows[index], columns[index], obstacle.sprite, obstacle.row, obstacle.column
+        ):
+            continue
+        collided_uids.add(uid)
+        canvas.addstr(round(rows[index]), round(columns[index]), " ")
+        bullets.kill(index)
+
+    bullets.compact()
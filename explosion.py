@@ -1,6 +1,6 @@
-import asyncio
-import curses
-from curses_tools import draw_frame, get_frame_size
+from array import array
+
+from curses_tools import Sprite, beep, draw_frame, get_frame_size
 
 EXPLOSION_FRAMES = [
     """\
@@ -29,16 +29,102 @@ EXPLOSION_FRAMES = [
     """,
 ]
 
-async def explode(canvas, center_row, center_column):
-    rows, columns = get_frame_size(EXPLOSION_FRAMES[0])
+EXPLOSION_SPRITES = [Sprite(frame) for frame in EXPLOSION_FRAMES]
+EXPLOSION_POOL_SIZE = 64
+
+
+class ExplosionPool:
+    """Fixed number of explosion slots allocated once, nothing is allocated while the game goes.
+
+    Free slots are kept in a stack, busy ones in spawn order. When all slots are
+    busy a new explosion is not shown, but it is still reported as finished on the
+    next update, so the game goes on as if it was shown.
+    """
+
+    def __init__(self, capacity=EXPLOSION_POOL_SIZE):
+        self.capacity = capacity
+        self.rows = array("d", [0]) * capacity
+        self.columns = array("d", [0]) * capacity
+        self.ages = array("H", [0]) * capacity
+        self.free_slots = array("H", reversed(range(capacity)))
+        self.busy_slots = array("H")
+        self.peak_count = 0
+        self.overflow_count = 0
+        self.unshown_count = 0
+
+    def __len__(self):
+        return len(self.busy_slots)
+
+    def get_arrays(self):
+        return self.rows, self.columns, self.ages, self.busy_slots
+
+    def spawn(self, corner_row, corner_column):
+        """Take a free slot for the explosion. Return the slot or None when the pool is full."""
+        if not self.free_slots:
+            self.overflow_count += 1
+            self.unshown_count += 1
+            return None
+        slot = self.free_slots.pop()
+        self.rows[slot] = corner_row
+        self.columns[slot] = corner_column
+        self.ages[slot] = 0
+        self.busy_slots.append(slot)
+        self.peak_count = max(self.peak_count, len(self.busy_slots))
+        return slot
+
+    def clear(self):
+        self.free_slots = array("H", reversed(range(self.capacity)))
+        del self.busy_slots[:]
+        self.peak_count = self.overflow_count = self.unshown_count = 0
+
+    def get_fill(self):
+        """Return share of the busy slots, from 0 to 1."""
+        return len(self.busy_slots) / self.capacity
+
+    def get_stats(self):
+        return {
+            "busy": len(self.busy_slots),
+            "capacity": self.capacity,
+            "peak": self.peak_count,
+            "overflows": self.overflow_count,
+        }
+
+
+def spawn_explosion(explosions, center_row, center_column):
+    """Add explosion to the ExplosionPool, its frames are shown one after another."""
+    rows, columns = get_frame_size(EXPLOSION_SPRITES[0])
     corner_row = center_row - rows / 2
     corner_column = center_column - columns / 2
+    return explosions.spawn(corner_row, corner_column)
+
+
+def update_explosions(canvas, explosions, frame_step=1):
+    """Show next frame of every explosion in one pass over the busy slots. Return number of explosions finished.
 
-    curses.beep()
-    for frame in EXPLOSION_FRAMES:
+    Every frame is drawn for one tic and erased on the next one. With frame_step above 1
+    only every frame_step-th frame is drawn, explosions last as long as with all frames.
+    Finished explosions give their slots back to the pool.
+    """
+    rows, columns, ages = explosions.rows, explosions.columns, explosions.ages
+    busy_slots, free_slots = explosions.busy_slots, explosions.free_slots
+    finished_count, explosions.unshown_count = explosions.unshown_count, 0
+    kept_count = 0
 
-        draw_frame(canvas, corner_row, corner_column, frame)
+    for slot in busy_slots:
+        age = ages[slot]
+        frame_index, is_erased = divmod(age, 2)
+        if frame_index == len(EXPLOSION_SPRITES):
+            free_slots.append(slot)
+            finished_count += 1
+            continue
+        if not age:
+            beep()
+        # a skipped frame is neither drawn nor erased, erasing would blank what others drew
+        if not frame_index % frame_step:
+            draw_frame(canvas, rows[slot], columns[slot], EXPLOSION_SPRITES[frame_index], negative=is_erased)
+        ages[slot] = age + 1
+        busy_slots[kept_count] = slot
+        kept_count += 1
 
-        await asyncio.sleep(0)
-        draw_frame(canvas, corner_row, corner_column, frame, negative=True)
-        await asyncio.sleep(0)
+    del busy_slots[kept_count:]
+    return finished_count
@@ -1,27 +1,116 @@
-PHRASES = {
-    # Только на английском, Repl.it ломается на кириллице
-    1957: "First Sputnik",
-    1961: "Gagarin flew!",
-    1969: "Armstrong got on the moon!",
-    1971: "First orbital space station Salute-1",
-    1981: "Flight of the Shuttle Columbia",
-    1998: 'ISS start building',
-    2011: 'Messenger launch to Mercury',
-    2020: "Take the plasma gun! Shoot the garbage!",
-}
-
-def get_garbage_delay_tics(year):
-    if year < 1961:
-        return None
-    elif year < 1969:
-        return 20
-    elif year < 1981:
-        return 14
-    elif year < 1995:
-        return 10
-    elif year < 2010:
-        return 8
-    elif year < 2020:
-        return 6
-    else:
-        return 2
\ No newline at end of file
+"""Timeline of the game: garbage spawn rate, interesting facts and features unlocked by years.
+
+The timeline is read from a JSON file, scenario.json next to this module by default:
+
+    {
+        "first_year": 1957,
+        "last_year": 2022,
+        "year_tics": 15,
+        "garbage_delay_tics": {"1957": null, "1961": 20, ...},
+        "phrases": {"1957": "First Sputnik", ...},
+        "unlocks": {"fire": 2020}
+    }
+
+A garbage delay holds from its year until the next one (null — no garbage), a
+phrase is shown only in its own year, a feature is unlocked from its year on.
+Phrases are in English only, Repl.it breaks on Cyrillic.
+
+On load the timeline is compiled into eras: spans of years in which nothing
+but the year number changes. An era is found by binary search of the year, so
+a timeline of thousands of years costs the same per tic as a short one.
+"""
+import json
+import os
+from array import array
+from bisect import bisect_right
+
+SCENARIO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenario.json")
+
+
+class Era:
+    __slots__ = ("first_year", "last_year", "garbage_delay_tics", "phrase", "unlocks")
+
+    def __init__(self, first_year, last_year, garbage_delay_tics=None, phrase="", unlocks=frozenset()):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.garbage_delay_tics = garbage_delay_tics
+        self.phrase = phrase
+        self.unlocks = unlocks
+
+    def __contains__(self, year):
+        return self.first_year <= year <= self.last_year
+
+
+class Scenario:
+    """Compiled timeline. Years are plain ints, eras are looked up with get_era()."""
+
+    def __init__(self, first_year, last_year, year_tics, garbage_delay_tics, phrases, unlocks):
+        if last_year < first_year:
+            raise ValueError(f"Last year {last_year} of the scenario is before its first year {first_year}.")
+        if year_tics < 1:
+            raise ValueError(f"A year of the scenario has to last at least one tic, not {year_tics}.")
+        if any(delay is not None and delay < 1 for delay in garbage_delay_tics.values()):
+            raise ValueError("Garbage delays of the scenario have to be at least one tic or null.")
+
+        self.first_year = first_year
+        self.last_year = last_year
+        self.year_tics = year_tics
+        self.garbage_delay_tics = garbage_delay_tics
+        self.phrases = phrases
+        self.unlocks = unlocks
+
+        breakpoints = sorted({
+            *garbage_delay_tics, *phrases, *(year + 1 for year in phrases), *unlocks.values(),
+        })
+        delay_years = sorted(garbage_delay_tics)
+        self.era_years = array("q", breakpoints)
+        self.eras = []
+        for index, year in enumerate(breakpoints):
+            delay_index = bisect_right(delay_years, year) - 1
+            self.eras.append(Era(
+                year,
+                breakpoints[index + 1] - 1 if index + 1 < len(breakpoints) else float("inf"),
+                garbage_delay_tics[delay_years[delay_index]] if delay_index >= 0 else None,
+                phrases.get(year, ""),
+                frozenset(feature for feature, unlock_year in unlocks.items() if unlock_year <= year),
+            ))
+        self.empty_era = Era(float("-inf"), breakpoints[0] - 1 if breakpoints else float("inf"))
+
+    @classmethod
+    def from_dict(cls, scenario):
+        def get_years(values):
+            return {int(year): value for year, value in values.items()}
+
+        return cls(
+            scenario["first_year"],
+            scenario["last_year"],
+            scenario["year_tics"],
+            get_years(scenario.get("garbage_delay_tics", {})),
+            get_years(scenario.get("phrases", {})),
+            scenario.get("unlocks", {}),
+        )
+
+    def get_era(self, year):
+        """Return era the year belongs to."""
+        index = bisect_right(self.era_years, year) - 1
+        if index < 0:
+            return self.empty_era
+        return self.eras[index]
+
+    def get_garbage_delay_tics(self, year):
+        return self.get_era(year).garbage_delay_tics
+
+    def get_phrase(self, year):
+        return self.get_era(year).phrase
+
+    def is_unlocked(self, feature, year):
+        return feature in self.get_era(year).unlocks
+
+
+def load_scenario(path=SCENARIO_PATH):
+    """Read timeline from a JSON file and compile it."""
+    with open(path, "r") as scenario_file:
+        try:
+            return Scenario.from_dict(json.load(scenario_file))
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"{path} is not a valid scenario: {error}") from error
@@ -0,0 +1,93 @@
+import select
+import statistics
+import time
+from collections import deque
+
+INPUT_QUEUE_SIZE = 64
+LATENCY_SAMPLES = 256
+
+
+class InputQueue:
+    """Bounded queue of key presses stamped with the time they were read.
+
+    Keys are read as soon as they arrive: at the start of every tic and while
+    the game waits for the next tic (wait() is used as the sleep function of
+    the tick scheduler, in asyncio mode poll() is registered as a reader of the
+    terminal). When the queue is full the oldest keys are dropped.
+
+    Events made by the game itself, like level of detail changes, go to a
+    separate unbounded queue, so a burst of keys never drops them. They are
+    given out before the keys and do not count in the latency.
+
+    The time from reading a key to the refresh that shows its result is kept
+    as the input-to-screen latency.
+    """
+
+    def __init__(self, read_key, fileno=None, maxlen=INPUT_QUEUE_SIZE, clock=time.perf_counter):
+        self.read_key = read_key
+        self.fileno = fileno
+        self.clock = clock
+        self.events = deque(maxlen=maxlen)
+        self.game_events = deque()
+        self.dropped_count = 0
+        self.applied_timestamps = []
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def __len__(self):
+        return len(self.events)
+
+    def poll(self):
+        """Move all keys waiting in the terminal to the queue."""
+        while True:
+            key_code = self.read_key()
+            if key_code == -1:
+                # https://docs.python.org/3/library/curses.html#curses.window.getch
+                break
+            if len(self.events) == self.events.maxlen:
+                self.dropped_count += 1
+            self.events.append((self.clock(), key_code))
+
+    def wait(self, timeout):
+        """Sleep for timeout seconds, reading keys the moment they arrive."""
+        if self.fileno is None:
+            time.sleep(timeout)
+            return
+        deadline = self.clock() + timeout
+        while timeout > 0:
+            readable, _, _ = select.select([self.fileno], [], [], timeout)
+            if readable:
+                self.poll()
+            timeout = deadline - self.clock()
+
+    def push(self, event_code):
+        """Add event made by the game itself, it is never dropped."""
+        self.game_events.append(event_code)
+
+    def pop_keys(self):
+        """Return codes of all queued game events and then of all key presses in arrival order, empty the queues."""
+        self.poll()
+        key_codes = list(self.game_events)
+        self.game_events.clear()
+        while self.events:
+            timestamp, key_code = self.events.popleft()
+            self.applied_timestamps.append(timestamp)
+            key_codes.append(key_code)
+        return key_codes
+
+    def mark_rendered(self):
+        """Record latency of the keys applied since the previous refresh of the screen."""
+        now = self.clock()
+        for timestamp in self.applied_timestamps:
+            self.latencies.append(now - timestamp)
+        self.applied_timestamps.clear()
+
+    def get_latency_stats(self):
+        """Return input-to-screen latency in milliseconds over the recent key presses."""
+        if not self.latencies:
+            return {"samples": 0, "p50_ms": None, "max_ms": None, "dropped": self.dropped_count}
+        return {
+            "samples": len(self.latencies),
+            "p50_ms": round(statistics.median(self.latencies) * 1000, 2),
+            "max_ms": round(max(self.latencies) * 1000, 2),
+            "dropped": self.dropped_count,
+        }
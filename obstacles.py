@@ -1,15 +1,23 @@
 import asyncio
+import math
+from array import array
+
 from curses_tools import draw_frame
 
+OBSTACLE_INDEX_CELL_SIZE = 8
+
 
 class Obstacle:
-    
-    def __init__(self, row, column, rows_size=1, columns_size=1, uid=None):
+    __slots__ = ("row", "column", "rows_size", "columns_size", "uid", "sprite")
+
+    def __init__(self, row, column, rows_size=1, columns_size=1, uid=None, sprite=None):
+        """Obstacle with sprite collides by sprite collision mask, without sprite — by its whole box."""
         self.row = row
         self.column = column
         self.rows_size = rows_size
         self.columns_size = columns_size
         self.uid = uid
+        self.sprite = sprite
     
     def get_bounding_box_frame(self):
         # increment box size to compensate obstacle movement
@@ -33,6 +41,123 @@ class Obstacle:
         )
 
 
+class ObstacleIndex:
+    """Spatial hash of obstacles keyed by uid.
+
+    The field is split into square cells, every obstacle is registered in all
+    cells its box touches. Queries check only obstacles from the cells around
+    the asked box, so their cost depends on how many obstacles are nearby,
+    not on how many exist in total.
+    """
+
+    def __init__(self, cell_size=OBSTACLE_INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self.obstacles = {}
+        self.obstacle_cells = {}
+        self.cells = {}
+        self.next_uid = 0
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    def __iter__(self):
+        return iter(list(self.obstacles.values()))
+
+    def __contains__(self, uid):
+        return uid in self.obstacles
+
+    def _get_cells(self, row, column, rows_size, columns_size):
+        first_row, last_row = math.floor(row) // self.cell_size, math.floor(row + rows_size) // self.cell_size
+        first_column = math.floor(column) // self.cell_size
+        last_column = math.floor(column + columns_size) // self.cell_size
+        return tuple(
+            (cell_row, cell_column)
+            for cell_row in range(first_row, last_row + 1)
+            for cell_column in range(first_column, last_column + 1)
+        )
+
+    def _link(self, uid, cells):
+        self.obstacle_cells[uid] = cells
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(uid)
+
+    def _unlink(self, uid):
+        for cell in self.obstacle_cells.pop(uid):
+            cell_uids = self.cells[cell]
+            cell_uids.discard(uid)
+            if not cell_uids:
+                del self.cells[cell]
+
+    def insert(self, obstacle):
+        """Add obstacle to the index, obstacle without uid gets a new one. Return uid."""
+        if obstacle.uid is None:
+            obstacle.uid = self.next_uid
+            self.next_uid += 1
+        if obstacle.uid in self.obstacles:
+            raise KeyError(f"Obstacle with uid {obstacle.uid} is already in the index.")
+        self.obstacles[obstacle.uid] = obstacle
+        self._link(obstacle.uid, self._get_cells(obstacle.row, obstacle.column, obstacle.rows_size, obstacle.columns_size))
+        return obstacle.uid
+
+    def move(self, uid, row, column):
+        obstacle = self.obstacles[uid]
+        obstacle.row, obstacle.column = row, column
+        cells = self._get_cells(row, column, obstacle.rows_size, obstacle.columns_size)
+        if cells != self.obstacle_cells[uid]:
+            self._unlink(uid)
+            self._link(uid, cells)
+
+    def remove(self, uid):
+        self._unlink(uid)
+        return self.obstacles.pop(uid)
+
+    def clear(self):
+        self.obstacles.clear()
+        self.obstacle_cells.clear()
+        self.cells.clear()
+        self.next_uid = 0
+
+    def get_nearby_uids(self, row, column, rows_size=1, columns_size=1):
+        uids = set()
+        for cell in self._get_cells(row, column, rows_size, columns_size):
+            uids.update(self.cells.get(cell, ()))
+        return uids
+
+    def query_boxes(self, probe_boxes):
+        """Find obstacles colliding with every probe box. Return sorted list of (obstacle uid, probe index)."""
+        uids = set()
+        for probe_index in range(len(probe_boxes)):
+            uids.update(self.get_nearby_uids(
+                probe_boxes.rows[probe_index],
+                probe_boxes.columns[probe_index],
+                probe_boxes.rows_sizes[probe_index],
+                probe_boxes.columns_sizes[probe_index],
+            ))
+        if not uids:
+            return []
+        uids = sorted(uids)
+        obstacle_boxes = Boxes.from_obstacles(self.obstacles[uid] for uid in uids)
+        return [(uids[obstacle_index], probe_index) for obstacle_index, probe_index in find_collisions(obstacle_boxes, probe_boxes)]
+
+    def query_box(self, row, column, rows_size=1, columns_size=1):
+        """Return obstacles colliding with the box, ordered by uid."""
+        collisions = self.query_boxes(Boxes([(row, column, rows_size, columns_size)]))
+        return [self.obstacles[uid] for uid, _ in collisions]
+
+    def query_point(self, row, column):
+        return self.query_box(row, column)
+
+    def query_sprite(self, sprite, row, column):
+        """Return obstacles touching non-space cells of sprite drawn at row, column, ordered by uid."""
+        return [
+            obstacle
+            for obstacle in self.query_box(round(row), round(column), sprite.rows, sprite.columns)
+            if obstacle.sprite is None or has_mask_collision(
+                sprite, row, column, obstacle.sprite, obstacle.row, obstacle.column
+            )
+        ]
+
+
 def _get_bounding_box_lines(rows, columns):
 
     yield ' ' + '-' * columns + ' '
@@ -59,30 +184,97 @@ async def show_obstacles(canvas, obstacles):
             draw_frame(canvas, row, column, frame, negative=True)
 
 
-def _is_point_inside(corner_row, corner_column, size_rows, size_columns, point_row, point_row_column):
-    rows_flag = corner_row <= point_row < corner_row + size_rows
-    columns_flag = corner_column <= point_row_column < corner_column + size_columns
+class Boxes:
+    """Parallel arrays of box corners and sizes, the input of find_collisions."""
+
+    __slots__ = ("rows", "columns", "rows_sizes", "columns_sizes")
+
+    def __init__(self, boxes=()):
+        self.rows = array("d")
+        self.columns = array("d")
+        self.rows_sizes = array("d")
+        self.columns_sizes = array("d")
+        for box in boxes:
+            self.append(*box)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, row, column, rows_size=1, columns_size=1):
+        self.rows.append(row)
+        self.columns.append(column)
+        self.rows_sizes.append(rows_size)
+        self.columns_sizes.append(columns_size)
+
+    @classmethod
+    def from_obstacles(cls, obstacles):
+        return cls((obstacle.row, obstacle.column, obstacle.rows_size, obstacle.columns_size) for obstacle in obstacles)
 
-    return rows_flag and columns_flag
+
+def find_collisions(obstacle_boxes, probe_boxes):
+    """Find all overlapping pairs of obstacle and probe boxes. Return sorted list of (obstacle_index, probe_index).
+
+    Boxes cover half-open intervals [row, row + rows_size) and [column, column + columns_size).
+    Boxes of both kinds are swept together by the row they start at, every box is
+    tested only against boxes of the other kind whose rows are still open.
+    """
+    obstacles_count = len(obstacle_boxes)
+    rows = obstacle_boxes.rows + probe_boxes.rows
+    columns = obstacle_boxes.columns + probe_boxes.columns
+    rows_ends = array("d", map(sum, zip(rows, obstacle_boxes.rows_sizes + probe_boxes.rows_sizes)))
+    columns_ends = array("d", map(sum, zip(columns, obstacle_boxes.columns_sizes + probe_boxes.columns_sizes)))
+
+    collisions = []
+    open_boxes = ([], [])
+    for box_index in sorted(range(len(rows)), key=rows.__getitem__):
+        row, column, column_end = rows[box_index], columns[box_index], columns_ends[box_index]
+        if rows_ends[box_index] <= row or column_end <= column:
+            # a box of zero size covers no cell and collides with nothing
+            continue
+        is_probe = box_index >= obstacles_count
+
+        for kind in (0, 1):
+            if open_boxes[kind] and min(rows_ends[index] for index in open_boxes[kind]) <= row:
+                open_boxes[kind][:] = [index for index in open_boxes[kind] if rows_ends[index] > row]
+
+        for other_index in open_boxes[not is_probe]:
+            if columns[other_index] < column_end and column < columns_ends[other_index]:
+                if is_probe:
+                    collisions.append((other_index, box_index - obstacles_count))
+                else:
+                    collisions.append((box_index, other_index - obstacles_count))
+
+        open_boxes[is_probe].append(box_index)
+
+    collisions.sort()
+    return collisions
 
 
 def has_collision(obstacle_corner, obstacle_size, obj_corner, obj_size=(1, 1)):
     '''Determine if collision has occured. Return True or False.'''
 
-    opposite_obstacle_corner = (
-        obstacle_corner[0] + obstacle_size[0] - 1,
-        obstacle_corner[1] + obstacle_size[1] - 1,
-    )
+    return bool(find_collisions(Boxes([(*obstacle_corner, *obstacle_size)]), Boxes([(*obj_corner, *obj_size)])))
+
+
+def has_mask_collision(sprite, row, column, other_sprite, other_row, other_column):
+    """Determine if non-space cells of two sprites overlap, positions are rounded the way sprites are drawn."""
 
-    opposite_obj_corner = (
-        obj_corner[0] + obj_size[0] - 1,
-        obj_corner[1] + obj_size[1] - 1,
-    )
+    row, column = round(row), round(column)
+    other_row, other_column = round(other_row), round(other_column)
 
-    return any([
-        _is_point_inside(*obstacle_corner, *obstacle_size, *obj_corner),
-        _is_point_inside(*obstacle_corner, *obstacle_size, *opposite_obj_corner),
+    first_row, last_row = max(row, other_row), min(row + sprite.rows, other_row + other_sprite.rows)
+    if first_row >= last_row:
+        return False
+    if column >= other_column + other_sprite.columns or other_column >= column + sprite.columns:
+        return False
 
-        _is_point_inside(*obj_corner, *obj_size, *obstacle_corner),
-        _is_point_inside(*obj_corner, *obj_size, *opposite_obstacle_corner),
-    ])
\ No newline at end of file
+    shift = other_column - column
+    for overlap_row in range(first_row, last_row):
+        row_mask = sprite.mask[overlap_row - row]
+        other_row_mask = other_sprite.mask[overlap_row - other_row]
+        if shift >= 0:
+            if row_mask & (other_row_mask << shift):
+                return True
+        elif (row_mask << -shift) & other_row_mask:
+            return True
+    return False
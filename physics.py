@@ -1,4 +1,11 @@
 import math
+from array import array
+
+# cos(speed_fraction) for speed_fraction from 0 to 1, speeds never exceed their limit after fading.
+# Linear interpolation in the table differs from math.cos by less than ACCELERATION_TOLERANCE.
+ACCELERATION_TABLE_SIZE = 1024
+ACCELERATION_TABLE = array("d", (math.cos(index / ACCELERATION_TABLE_SIZE) for index in range(ACCELERATION_TABLE_SIZE + 2)))
+ACCELERATION_TOLERANCE = 1e-6
 
 def _limit(value, min_value, max_value):
     """Limit value by min_value and max_value."""
@@ -35,6 +42,50 @@ def _apply_acceleration(speed, speed_limit, forward=True):
     return result_speed
 
 
+def _get_acceleration_delta(speed_fraction):
+    """Return math.cos(speed_fraction) * 0.75 looked up in ACCELERATION_TABLE."""
+
+    position = abs(speed_fraction) * ACCELERATION_TABLE_SIZE
+    index = int(position)
+    if index > ACCELERATION_TABLE_SIZE:
+        return math.cos(speed_fraction) * 0.75
+    low_value = ACCELERATION_TABLE[index]
+    return (low_value + (ACCELERATION_TABLE[index + 1] - low_value) * (position - index)) * 0.75
+
+
+def update_speeds(row_speeds, column_speeds, rows_directions=0, columns_directions=0, row_speed_limit=2, column_speed_limit=2, fading=0.8):
+    """Update speeds of many bodies in place, same as update_speed() called for every one of them.
+
+    row_speeds, column_speeds — mutable sequences of speeds, e.g. arrays of an EntityStore.
+    rows_directions, columns_directions — sequences of -1, 0, 1 per body, or one value for all bodies.
+    Results match the math.cos formula of _apply_acceleration within ACCELERATION_TOLERANCE,
+    except speeds within that distance from the 0.1 stop threshold, see checks.py.
+    """
+
+    if fading < 0 or fading > 1:
+        raise ValueError(f'Wrong columns_direction value {fading}. Expects float between 0 and 1.')
+
+    for speeds, directions, speed_limit in (
+        (row_speeds, rows_directions, abs(row_speed_limit)),
+        (column_speeds, columns_directions, abs(column_speed_limit)),
+    ):
+        if isinstance(directions, int):
+            directions = [directions] * len(speeds)
+
+        for index, direction in enumerate(directions):
+            # гасим скорость, чтобы корабль останавливался со временем
+            speed = speeds[index] * fading
+            if direction:
+                delta = _get_acceleration_delta(speed / speed_limit)
+                speed = speed + delta if direction > 0 else speed - delta
+                speed = _limit(speed, -speed_limit, speed_limit)
+                if abs(speed) < 0.1:
+                    speed = 0
+            speeds[index] = speed
+
+    return row_speeds, column_speeds
+
+
 def update_speed(row_speed, column_speed, rows_direction, columns_direction, row_speed_limit=2, column_speed_limit=2, fading=0.8):
     """Update speed smootly to make control handy for player. Return new speed value (row_speed, column_speed)
     
@@ -55,20 +106,7 @@ def update_speed(row_speed, column_speed, rows_direction, columns_direction, row
     if columns_direction not in (-1, 0, 1):
         raise ValueError(f'Wrong columns_direction value {columns_direction}. Expects -1, 0 or 1.')
     
-    if fading < 0 or fading > 1:
-        raise ValueError(f'Wrong columns_direction value {fading}. Expects float between 0 and 1.')
-        
-
-    # гасим скорость, чтобы корабль останавливался со временем
-    row_speed *= fading
-    column_speed *= fading
-
-    row_speed_limit, column_speed_limit = abs(row_speed_limit), abs(column_speed_limit)
-
-    if rows_direction != 0:
-        row_speed = _apply_acceleration(row_speed, row_speed_limit, rows_direction > 0)
-
-    if columns_direction != 0:
-        column_speed = _apply_acceleration(column_speed, column_speed_limit, columns_direction > 0)
-
-    return row_speed, column_speed
\ No newline at end of file
+    row_speeds, column_speeds = update_speeds(
+        [row_speed], [column_speed], rows_direction, columns_direction, row_speed_limit, column_speed_limit, fading
+    )
+    return row_speeds[0], column_speeds[0]
\ No newline at end of file
@@ -0,0 +1,70 @@
+import statistics
+import time
+from collections import deque
+
+# level of detail settings from full quality to the cheapest one: only every
+# stars_twinkling_step-th star twinkles, stars advance once in blink_interval tics,
+# explosions show every explosion_frame_step-th frame, max_garbage caps live garbage
+LOD_LEVELS = (
+    {"stars_twinkling_step": 1, "blink_interval": 1, "explosion_frame_step": 1, "max_garbage": None},
+    {"stars_twinkling_step": 2, "blink_interval": 1, "explosion_frame_step": 1, "max_garbage": None},
+    {"stars_twinkling_step": 2, "blink_interval": 2, "explosion_frame_step": 1, "max_garbage": None},
+    {"stars_twinkling_step": 4, "blink_interval": 2, "explosion_frame_step": 2, "max_garbage": None},
+    {"stars_twinkling_step": 4, "blink_interval": 2, "explosion_frame_step": 2, "max_garbage": 40},
+    {"stars_twinkling_step": 4, "blink_interval": 4, "explosion_frame_step": 2, "max_garbage": 20},
+)
+LOD_WINDOW = 20
+LOD_OVER_BUDGET = 0.9
+LOD_HEADROOM = 0.5
+# level changes go to the input queue as events with codes above any curses key code,
+# so they are applied in the same tic of a recorded session when it is replayed
+LOD_EVENT_BASE = 0xF000
+
+
+class QualityGovernor:
+    """Lower the level of detail when tics take longer than their time budget.
+
+    Mean duration of the last window tics is compared to the budget of one tic:
+    above LOD_OVER_BUDGET of it the level goes one step down in quality, below
+    LOD_HEADROOM one step up. The gap between the two and the window refilled
+    after every change keep the level from flapping. Cosmetic load goes first,
+    the cap on live garbage comes only on the last levels.
+
+    The governor only proposes levels, the game applies them with set_level(),
+    no other level is proposed until then.
+    tick_rate=0 means no budget, the governor is disabled and proposes nothing.
+    """
+
+    def __init__(self, tick_rate=0, window=LOD_WINDOW, clock=time.perf_counter):
+        self.tick_budget = 1 / tick_rate if tick_rate else 0
+        self.is_enabled = bool(tick_rate)
+        self.clock = clock
+        self.level = 0
+        self.level_changes = 0
+        self.proposed_level = None
+        self.tick_durations = deque(maxlen=window)
+
+    @property
+    def settings(self):
+        return LOD_LEVELS[self.level]
+
+    def observe(self, tick_duration):
+        """Record duration of a tic in seconds. Return level to switch to or None to keep the current one."""
+        self.tick_durations.append(tick_duration)
+        if self.proposed_level is not None or len(self.tick_durations) < self.tick_durations.maxlen:
+            return None
+
+        load = statistics.fmean(self.tick_durations) / self.tick_budget
+        if load > LOD_OVER_BUDGET and self.level < len(LOD_LEVELS) - 1:
+            self.proposed_level = self.level + 1
+        elif load < LOD_HEADROOM and self.level > 0:
+            self.proposed_level = self.level - 1
+        return self.proposed_level
+
+    def set_level(self, level):
+        level = max(0, min(level, len(LOD_LEVELS) - 1))
+        if level != self.level:
+            self.level = level
+            self.level_changes += 1
+        self.proposed_level = None
+        self.tick_durations.clear()
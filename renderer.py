@@ -0,0 +1,110 @@
+import curses
+import sys
+from array import array
+
+from virtual_canvas import VirtualCanvas, from_code_points
+
+
+def get_changed_runs(chars, attrs, front_chars, front_attrs, rows, columns):
+    """Yield (row, column, text, attr) runs of cells differing from the front buffer, all cells of a run share attr.
+
+    Every changed row is copied to the front buffer once its runs are yielded.
+    """
+    for row in range(rows):
+        row_start, row_end = row * columns, (row + 1) * columns
+        if chars[row_start:row_end] == front_chars[row_start:row_end] and \
+                attrs[row_start:row_end] == front_attrs[row_start:row_end]:
+            continue
+
+        index = row_start
+        while index < row_end:
+            if chars[index] == front_chars[index] and attrs[index] == front_attrs[index]:
+                index += 1
+                continue
+            run_start, attr = index, attrs[index]
+            while index < row_end and attrs[index] == attr and \
+                    (chars[index] != front_chars[index] or attrs[index] != front_attrs[index]):
+                index += 1
+            yield row, run_start - row_start, from_code_points(chars[run_start:index]), attr
+
+        front_chars[row_start:row_end] = chars[row_start:row_end]
+        front_attrs[row_start:row_end] = attrs[row_start:row_end]
+
+
+class BufferedCanvas(VirtualCanvas):
+    """Double-buffered wrapper of a curses window.
+
+    The game draws into the back buffer, which is an in-memory canvas. On
+    refresh() only the cells that differ from the front buffer (what is on the
+    screen now) are sent to curses, grouped in runs of changed cells with the
+    same attribute, and the terminal is updated with one doupdate() call.
+    Drawing and erasing the same cell within a tic costs nothing on the terminal.
+    """
+
+    def __init__(self, window):
+        rows, columns = window.getmaxyx()
+        super().__init__(rows, columns)
+        self.window = window
+        # curses reads keys from stdin, the input queue waits on it between tics
+        self.input_fileno = sys.stdin.fileno()
+        self.front_chars = array("I", self.chars)
+        self.front_attrs = array("L", self.attrs)
+        self.window_rows, self.window_columns = rows, columns
+        self.frame_writes = 0
+        self.frame_cells = 0
+        self.total_cells = 0
+
+    def update_size(self):
+        """Follow the size of the curses window after KEY_RESIZE, the whole screen is sent on the next refresh."""
+        rows, columns = self.window.getmaxyx()
+        if (rows, columns) == (self.rows, self.columns):
+            return
+        self.resize(rows, columns)
+        self.clip_to_window()
+
+    def clip_to_window(self):
+        """Keep the size of the back buffer, show only its part that fits the curses window after KEY_RESIZE."""
+        self.window_rows, self.window_columns = self.window.getmaxyx()
+        # nothing is known about the terminal content now, no cell matches the front buffer
+        self.front_chars = array("I", [0]) * (self.rows * self.columns)
+        self.front_attrs = array("L", self.attrs)
+
+    def nodelay(self, flag):
+        super().nodelay(flag)
+        self.window.nodelay(flag)
+
+    def getch(self):
+        return self.window.getch()
+
+    def _put(self, row, column, text, attr):
+        if row >= self.window_rows or column >= self.window_columns:
+            return
+        text = text[:self.window_columns - column]
+        try:
+            self.window.addstr(row, column, text, attr)
+        except curses.error:
+            # writing to the lower right corner moves cursor out of the window, the text is written anyway
+            if (row, column + len(text)) != (self.window_rows - 1, self.window_columns):
+                raise
+        self.frame_writes += 1
+        self.frame_cells += len(text)
+
+    def noutrefresh(self):
+        """Send changed cells of the back buffer to the curses window without updating the terminal."""
+        self.frame_writes = self.frame_cells = 0
+        if self.window.getmaxyx() != (self.window_rows, self.window_columns):
+            # curses may resize the window before KEY_RESIZE is read
+            self.clip_to_window()
+        changed_runs = get_changed_runs(
+            self.chars, self.attrs, self.front_chars, self.front_attrs, self.rows, self.columns
+        )
+        for row, column, text, attr in changed_runs:
+            self._put(row, column, text, attr)
+
+        self.total_cells += self.frame_cells
+        self.refresh_count += 1
+        self.window.noutrefresh()
+
+    def refresh(self):
+        self.noutrefresh()
+        curses.doupdate()
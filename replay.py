@@ -0,0 +1,74 @@
+"""Replay a recorded session without terminal as fast as the simulation runs.
+
+The session is recorded with `python space_game.py --record LOG_PATH`. Replaying
+it seeds the RNG, plays the same keys in the same tics on a virtual canvas of the
+recorded size, resized in the tics the terminal was, and prints a digest of the
+final game state: two replays of one log print the same digest, so a change of the
+digest means the simulation has changed.
+"""
+import argparse
+import hashlib
+import random
+import time
+
+import space_game
+from game_scenario import SCENARIO_PATH, load_scenario
+from session_log import ReplayInputQueue, read_session
+from virtual_canvas import VirtualCanvas
+
+
+class NullCanvas(VirtualCanvas):
+    """Canvas that drops all drawing, the game runs only its simulation."""
+
+    def addstr(self, *args):
+        pass
+
+    def addch(self, *args):
+        pass
+
+    def border(self, *args):
+        pass
+
+
+def get_state_digest():
+    """Return sha256 of the year, game over flag and entity arrays, drawing does not change it."""
+    digest = hashlib.sha256()
+    digest.update(f"{space_game.YEAR} {space_game.GAME_OVER}".encode())
+    for store in (space_game.GARBAGE, space_game.BULLETS, space_game.EXPLOSIONS):
+        for column in store.get_arrays():
+            digest.update(column.tobytes())
+    return digest.hexdigest()
+
+
+def replay_session(session, render=True):
+    """Play the session at full speed, return the elapsed seconds."""
+    space_game.reset_game_state()
+    random.seed(session["seed"])
+    canvas_class = VirtualCanvas if render else NullCanvas
+    canvas = canvas_class(session["rows"], session["columns"])
+    input_queue = ReplayInputQueue(session["keys_by_tic"], session["sizes_by_tic"], canvas.set_terminal_size)
+
+    replay_start = time.perf_counter()
+    space_game.draw(canvas, tics=session["tics"], tick_rate=0, input_queue=input_queue)
+    return time.perf_counter() - replay_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session of the space game.")
+    parser.add_argument("log_path", help="session log written by space_game.py --record")
+    parser.add_argument("--no-render", action="store_true", help="skip drawing, run only the simulation")
+    parser.add_argument("--scenario", default=SCENARIO_PATH, help="timeline the session was recorded with")
+    args = parser.parse_args()
+    space_game.set_scenario(load_scenario(args.scenario))
+
+    session = read_session(args.log_path)
+    elapsed = replay_session(session, render=not args.no_render)
+    recorded_duration = session["tics"] / space_game.TICK_RATE
+    print(f"tics: {session['tics']}, replayed in {elapsed:.3f} s "
+          f"({recorded_duration / elapsed if elapsed else 0:.0f}x real time at {space_game.TICK_RATE} tics/s)")
+    print(f"year: {space_game.YEAR}, game over: {space_game.GAME_OVER}")
+    print(f"state digest: {get_state_digest()}")
+
+
+if __name__ == "__main__":
+    main()
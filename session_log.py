@@ -0,0 +1,126 @@
+"""Binary log of a game session: RNG seed, terminal size and keys applied in every tic.
+
+Layout, little-endian:
+    header  — magic b"SGRP", format version (H), seed (Q), rows (H), columns (H)
+    records — tic number (I), keys count (B), key codes (H each), only for tics with keys
+    resize  — tic number (I), 255 instead of keys count, terminal rows (H) and columns (H),
+              after the keys of a tic with KEY_RESIZE
+    trailer — record with the total number of tics and zero keys count
+
+Logs of version 1 have no resize records, up to 255 keys fit one record there.
+"""
+import curses
+import struct
+from array import array
+
+from input_events import InputQueue
+
+LOG_MAGIC = b"SGRP"
+LOG_VERSION = 2
+READABLE_LOG_VERSIONS = (1, 2)
+LOG_HEADER = struct.Struct("<4sHQHH")
+TIC_RECORD = struct.Struct("<IB")
+RESIZE_RECORD = struct.Struct("<HH")
+RESIZE_MARKER = 255
+MAX_KEYS_IN_RECORD = 254
+
+
+class SessionRecorder:
+
+    def __init__(self, path, seed, rows, columns):
+        self.log_file = open(path, "wb")
+        self.log_file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, seed, rows, columns))
+        self.tics_passed = 0
+
+    def record_tic(self, key_codes, terminal_size=None):
+        """Write keys of the tic and the terminal size if they have KEY_RESIZE."""
+        for chunk_start in range(0, len(key_codes), MAX_KEYS_IN_RECORD):
+            chunk = key_codes[chunk_start:chunk_start + MAX_KEYS_IN_RECORD]
+            self.log_file.write(TIC_RECORD.pack(self.tics_passed, len(chunk)))
+            self.log_file.write(array("H", chunk).tobytes())
+        if terminal_size is not None:
+            self.log_file.write(TIC_RECORD.pack(self.tics_passed, RESIZE_MARKER))
+            self.log_file.write(RESIZE_RECORD.pack(*terminal_size))
+        self.tics_passed += 1
+
+    def close(self):
+        if self.log_file.closed:
+            return
+        self.log_file.write(TIC_RECORD.pack(self.tics_passed, 0))
+        self.log_file.close()
+
+
+def read_session(path):
+    """Return dict with seed, rows, columns, tics, keys_by_tic and sizes_by_tic read from session log."""
+    with open(path, "rb") as log_file:
+        content = log_file.read()
+
+    magic, version, seed, rows, columns = LOG_HEADER.unpack_from(content, 0)
+    if magic != LOG_MAGIC or version not in READABLE_LOG_VERSIONS:
+        raise ValueError(f"{path} is not a session log of version {LOG_VERSION}.")
+
+    keys_by_tic = {}
+    sizes_by_tic = {}
+    offset = LOG_HEADER.size
+    tics = 0
+    while offset < len(content):
+        tic, keys_count = TIC_RECORD.unpack_from(content, offset)
+        offset += TIC_RECORD.size
+        if not keys_count:
+            tics = tic
+            break
+        if keys_count == RESIZE_MARKER and version >= 2:
+            sizes_by_tic[tic] = RESIZE_RECORD.unpack_from(content, offset)
+            offset += RESIZE_RECORD.size
+            continue
+        key_codes = array("H")
+        key_codes.frombytes(content[offset:offset + keys_count * key_codes.itemsize])
+        offset += keys_count * key_codes.itemsize
+        keys_by_tic.setdefault(tic, []).extend(key_codes)
+
+    return {
+        "seed": seed,
+        "rows": rows,
+        "columns": columns,
+        "tics": tics,
+        "keys_by_tic": keys_by_tic,
+        "sizes_by_tic": sizes_by_tic,
+    }
+
+
+class RecordingInputQueue(InputQueue):
+    """Input queue writing keys applied in every tic to the session log, with the terminal size on KEY_RESIZE."""
+
+    def __init__(self, read_key, fileno, recorder, get_terminal_size):
+        super().__init__(read_key, fileno)
+        self.recorder = recorder
+        self.get_terminal_size = get_terminal_size
+
+    def pop_keys(self):
+        key_codes = super().pop_keys()
+        terminal_size = self.get_terminal_size() if curses.KEY_RESIZE in key_codes else None
+        self.recorder.record_tic(key_codes, terminal_size)
+        return key_codes
+
+
+class ReplayInputQueue(InputQueue):
+    """Input queue giving keys from a session log instead of the terminal.
+
+    Before the keys of a tic with KEY_RESIZE are given out the recorded terminal
+    size is passed to set_terminal_size, so the canvas takes it in the same tic.
+    """
+
+    def __init__(self, keys_by_tic, sizes_by_tic=None, set_terminal_size=None):
+        super().__init__(lambda: -1)
+        self.keys_by_tic = keys_by_tic
+        self.sizes_by_tic = sizes_by_tic or {}
+        self.set_terminal_size = set_terminal_size
+        self.tics_passed = 0
+
+    def pop_keys(self):
+        key_codes = list(self.keys_by_tic.get(self.tics_passed, ()))
+        terminal_size = self.sizes_by_tic.get(self.tics_passed)
+        if terminal_size is not None and self.set_terminal_size is not None:
+            self.set_terminal_size(*terminal_size)
+        self.tics_passed += 1
+        return key_codes
@@ -0,0 +1,122 @@
+"""Screen snapshots passed from the simulation process to the terminal process in shared memory.
+
+The block holds two slots, each with a full copy of the canvas cells. The
+simulation writes every tic into the slot the reader is not pointed to, then
+points the reader to it. Every slot has a sequence number, odd while the slot
+is being written, so a reader that raced with the writer sees the change and
+copies again.
+
+Layout, native byte order:
+    header — index of the latest complete slot (Q)
+    slot   — sequence (Q), tic (Q), bells rung so far (Q), character code points (4 bytes each), attributes (8 bytes each)
+"""
+import struct
+from array import array
+from multiprocessing import shared_memory
+
+import curses_tools
+from virtual_canvas import VirtualCanvas
+
+SNAPSHOT_HEADER = struct.Struct("=Q")
+SLOT_HEADER = struct.Struct("=QQQ")
+SLOTS_COUNT = 2
+
+
+class SnapshotBuffer:
+    """Double-buffered screen snapshots over a shared memory block."""
+
+    def __init__(self, memory, rows, columns):
+        self.memory = memory
+        self.rows = rows
+        self.columns = columns
+        cells = rows * columns
+        self.chars_size = cells * array("I").itemsize
+        self.attrs_size = cells * array("L").itemsize
+        self.slot_size = SLOT_HEADER.size + self.chars_size + self.attrs_size
+
+    @classmethod
+    def get_size(cls, rows, columns):
+        cells = rows * columns
+        slot_size = SLOT_HEADER.size + cells * (array("I").itemsize + array("L").itemsize)
+        return SNAPSHOT_HEADER.size + SLOTS_COUNT * slot_size
+
+    @classmethod
+    def create(cls, rows, columns):
+        """Allocate a new shared memory block, the creator has to unlink() it."""
+        memory = shared_memory.SharedMemory(create=True, size=cls.get_size(rows, columns))
+        memory.buf[:SNAPSHOT_HEADER.size + SLOT_HEADER.size * SLOTS_COUNT] = bytes(
+            SNAPSHOT_HEADER.size + SLOT_HEADER.size * SLOTS_COUNT
+        )
+        return cls(memory, rows, columns)
+
+    @classmethod
+    def attach(cls, name, rows, columns):
+        return cls(shared_memory.SharedMemory(name=name), rows, columns)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def _get_slot_offset(self, slot):
+        return SNAPSHOT_HEADER.size + slot * self.slot_size
+
+    def write(self, chars, attrs, tic, bells):
+        """Copy canvas cells to the free slot and make it the latest one."""
+        buffer = self.memory.buf
+        (latest_slot,) = SNAPSHOT_HEADER.unpack_from(buffer, 0)
+        slot = 1 - latest_slot
+        offset = self._get_slot_offset(slot)
+        sequence, _, _ = SLOT_HEADER.unpack_from(buffer, offset)
+
+        SLOT_HEADER.pack_into(buffer, offset, sequence + 1, tic, bells)
+        cells_offset = offset + SLOT_HEADER.size
+        buffer[cells_offset:cells_offset + self.chars_size] = memoryview(chars).cast("B")
+        cells_offset += self.chars_size
+        buffer[cells_offset:cells_offset + self.attrs_size] = memoryview(attrs).cast("B")
+        SLOT_HEADER.pack_into(buffer, offset, sequence + 2, tic, bells)
+
+        SNAPSHOT_HEADER.pack_into(buffer, 0, slot)
+
+    def read(self, chars, attrs, last_tic=None):
+        """Copy the latest complete snapshot to chars and attrs. Return its tic and bells.
+
+        Nothing is copied when the latest tic is still last_tic.
+        """
+        buffer = self.memory.buf
+        while True:
+            (slot,) = SNAPSHOT_HEADER.unpack_from(buffer, 0)
+            offset = self._get_slot_offset(slot)
+            sequence, tic, bells = SLOT_HEADER.unpack_from(buffer, offset)
+            if sequence % 2:
+                continue
+            if tic == last_tic:
+                return tic, bells
+
+            cells_offset = offset + SLOT_HEADER.size
+            memoryview(chars).cast("B")[:] = buffer[cells_offset:cells_offset + self.chars_size]
+            cells_offset += self.chars_size
+            memoryview(attrs).cast("B")[:] = buffer[cells_offset:cells_offset + self.attrs_size]
+
+            if SLOT_HEADER.unpack_from(buffer, offset)[0] == sequence:
+                return tic, bells
+
+    def close(self):
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
+
+
+class SnapshotCanvas(VirtualCanvas):
+    """Virtual canvas publishing its cells to a SnapshotBuffer on every refresh."""
+
+    def __init__(self, snapshots):
+        super().__init__(snapshots.rows, snapshots.columns)
+        self.snapshots = snapshots
+
+    def refresh(self):
+        super().refresh()
+        self.snapshots.write(self.chars, self.attrs, self.refresh_count, curses_tools.BEEPS_COUNT)
+
+    def noutrefresh(self):
+        self.refresh()
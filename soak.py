@@ -0,0 +1,219 @@
+"""Soak test: play the game without terminal for a long simulated time and look for growth.
+
+A synthetic player presses random keys, a new game starts whenever the ship
+is lost. Every sample the script records traced memory, sizes of the global
+entity stores and indexes and the number of live coroutines and generators,
+and the input-to-screen latency of the keys, which is shown but not checked.
+Samples of the first third of the run are the baseline: when even the lowest
+value of the last third is above the highest value of the baseline by more
+than the threshold, the value keeps growing and the soak fails with a report
+of the allocation sites that grew most.
+
+    $ python soak.py --minutes 60
+    $ python soak.py --minutes 600 --no-render --sample-minutes 5
+"""
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+import types
+
+import space_game
+from curses_tools import (
+    DOWN_KEY_CODE, LEFT_KEY_CODE, PROFILER_KEY_CODE, RIGHT_KEY_CODE, SPACE_KEY_CODE, UP_KEY_CODE,
+)
+from input_events import InputQueue
+from replay import NullCanvas
+from virtual_canvas import VirtualCanvas
+
+SYNTHETIC_KEYS = [UP_KEY_CODE, DOWN_KEY_CODE, LEFT_KEY_CODE, RIGHT_KEY_CODE] + [SPACE_KEY_CODE] * 4
+KEY_PRESS_CHANCE = 0.3
+PROFILER_TOGGLE_CHANCE = 0.001
+BASELINE_SHARE = 1 / 3
+LATE_SHARE = 1 / 3
+TRACE_FRAMES = 5
+REPORT_SITES = 10
+# values in the samples that are reported but may grow
+UNCHECKED_VALUES = {"tic", "input_p50_ms", "input_max_ms"}
+
+
+class GameEnded(Exception):
+    pass
+
+
+class SyntheticPlayer:
+    """Key source for InputQueue pressing at most one random key per read, seeded apart from the game."""
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.is_key_read = False
+
+    def read_key(self):
+        # InputQueue reads until -1, so every other read ends the tic
+        self.is_key_read = not self.is_key_read
+        if not self.is_key_read:
+            return -1
+        if self.random.random() < PROFILER_TOGGLE_CHANCE:
+            return PROFILER_KEY_CODE
+        if self.random.random() < KEY_PRESS_CHANCE:
+            return self.random.choice(SYNTHETIC_KEYS)
+        return -1
+
+
+class SoakCanvas(VirtualCanvas):
+    """Virtual canvas that treats every refresh() as the end of a game tick."""
+
+    def __init__(self, rows, columns, on_tick):
+        super().__init__(rows, columns)
+        self.on_tick = on_tick
+
+    def refresh(self):
+        super().refresh()
+        self.on_tick()
+
+
+class NullSoakCanvas(NullCanvas, SoakCanvas):
+    """Soak canvas that drops all drawing."""
+
+
+def count_coroutines():
+    """Return number of live coroutines and generators of the whole process."""
+    return sum(isinstance(obj, (types.CoroutineType, types.GeneratorType)) for obj in gc.get_objects())
+
+
+def take_sample(tic, input_queue):
+    current_memory, _ = tracemalloc.get_traced_memory()
+    latency = input_queue.get_latency_stats()
+    return {
+        "tic": tic,
+        "memory_kib": round(current_memory / 1024, 1),
+        "coroutines": count_coroutines(),
+        "garbage": len(space_game.GARBAGE),
+        "bullets": len(space_game.BULLETS),
+        "explosions": len(space_game.EXPLOSIONS),
+        "obstacles": len(space_game.OBSTACLES),
+        "obstacle_cells": len(space_game.OBSTACLES.cells),
+        "last_collisions": len(space_game.OBSTACLES_IN_LAST_COLLISIONS),
+        "input_p50_ms": latency["p50_ms"],
+        "input_max_ms": latency["max_ms"],
+    }
+
+
+def find_growth(samples, max_growth_kib, max_growth_objects):
+    """Return {value name: (baseline max, late min)} of the values that keep growing."""
+    baseline_size = max(1, int(len(samples) * BASELINE_SHARE))
+    late_size = max(1, int(len(samples) * LATE_SHARE))
+    if len(samples) < baseline_size + late_size:
+        return {}
+    baseline, late = samples[:baseline_size], samples[-late_size:]
+
+    growth = {}
+    for name in samples[0]:
+        if name in UNCHECKED_VALUES:
+            continue
+        threshold = max_growth_kib if name == "memory_kib" else max_growth_objects
+        baseline_max = max(sample[name] for sample in baseline)
+        late_min = min(sample[name] for sample in late)
+        if late_min - baseline_max > threshold:
+            growth[name] = (baseline_max, late_min)
+    return growth
+
+
+def print_top_sites(baseline_snapshot, snapshot, file=sys.stdout):
+    """Print allocation sites which memory grew most since the baseline snapshot, with their tracebacks."""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    differences = snapshot.filter_traces(filters).compare_to(baseline_snapshot.filter_traces(filters), "traceback")
+    for difference in [difference for difference in differences if difference.size_diff > 0][:REPORT_SITES]:
+        print(
+            f"{difference.size_diff / 1024:+.1f} KiB, {difference.count_diff:+} blocks, "
+            f"{difference.size / 1024:.1f} KiB in {difference.count} blocks now:",
+            file=file,
+        )
+        for line in difference.traceback.format(most_recent_first=True):
+            print(f"    {line}", file=file)
+
+
+def soak(rows, columns, tics, sample_tics, seed, render=True, year=None):
+    """Play games for a number of tics, return samples and tracemalloc snapshots of the baseline and the end."""
+    random.seed(seed)
+    player = SyntheticPlayer(seed)
+    samples = []
+    snapshots = {}
+    tics_passed = games_played = 0
+    baseline_tic = max(1, int(tics // sample_tics * BASELINE_SHARE)) * sample_tics
+
+    def on_tick():
+        nonlocal tics_passed
+        tics_passed += 1
+        if not tics_passed % sample_tics:
+            gc.collect()
+            samples.append(take_sample(tics_passed, input_queue))
+            if tics_passed == baseline_tic:
+                snapshots["baseline"] = tracemalloc.take_snapshot()
+        if space_game.GAME_OVER:
+            raise GameEnded()
+
+    canvas_class = SoakCanvas if render else NullSoakCanvas
+    tracemalloc.start(TRACE_FRAMES)
+    try:
+        while tics_passed < tics:
+            space_game.reset_game_state(year)
+            games_played += 1
+            input_queue = InputQueue(player.read_key)
+            try:
+                space_game.draw(
+                    canvas_class(rows, columns, on_tick),
+                    tics=tics - tics_passed,
+                    tick_rate=0,
+                    input_queue=input_queue,
+                )
+            except GameEnded:
+                pass
+        gc.collect()
+        snapshots["end"] = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    return samples, snapshots, games_played
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the space game for a long time and look for leaks.")
+    parser.add_argument("--minutes", type=float, default=60, help="simulated minutes of play")
+    parser.add_argument("--sample-minutes", type=float, default=1, help="simulated minutes between samples")
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--columns", type=int, default=120)
+    parser.add_argument("--year", type=int, help="year every game starts from, the last one of the scenario by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-render", action="store_true", help="skip drawing, run only the simulation")
+    parser.add_argument("--max-growth-kib", type=float, default=512, help="allowed growth of traced memory")
+    parser.add_argument("--max-growth-objects", type=int, default=100, help="allowed growth of object counts")
+    args = parser.parse_args()
+
+    tics = int(args.minutes * 60 * space_game.TICK_RATE)
+    sample_tics = max(1, int(args.sample_minutes * 60 * space_game.TICK_RATE))
+    if tics < 2 * sample_tics:
+        parser.error("the soak needs at least two samples, make --minutes longer or --sample-minutes shorter")
+    year = space_game.SCENARIO.last_year if args.year is None else args.year
+
+    samples, snapshots, games_played = soak(
+        args.rows, args.columns, tics, sample_tics, args.seed, render=not args.no_render, year=year
+    )
+    for sample in samples:
+        print(" ".join(f"{name}:{value}" for name, value in sample.items()), file=sys.stderr)
+    print(f"{tics} tics, {games_played} games, {len(samples)} samples", file=sys.stderr)
+
+    growth = find_growth(samples, args.max_growth_kib, args.max_growth_objects)
+    if not growth:
+        print("no growth found")
+        return
+
+    for name, (baseline_max, late_min) in growth.items():
+        print(f"{name} keeps growing: at most {baseline_max} in the first third of the soak, at least {late_min} in the last")
+    print("allocation sites grown since the baseline sample:")
+    print_top_sites(snapshots["baseline"], snapshots["end"])
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
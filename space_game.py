@@ -1,60 +1,147 @@
+import argparse
 import asyncio
 import curses
+import multiprocessing
 import random
-import time
+import select
+import signal
+from array import array
 from itertools import cycle
 
-from curses_tools import draw_frame, get_frame_size, read_controls
-from explosion import explode
-from game_scenario import PHRASES, get_garbage_delay_tics
-from obstacles import Obstacle
+from assets import ASSETS, FRAMES_DIR, get_asset, load_assets
+from checkpoints import read_checkpoint, write_checkpoint
+from coroutine_scheduler import CoroutineScheduler, sleep
+from curses_tools import CHECKPOINT_KEY_CODE, PROFILER_KEY_CODE, beep, draw_frame, get_frame_size, read_key_controls, ring_bell
+from entities import (
+    BULLET_SPRITE, SPRITES, EntityStore, clamp_garbage, kill_outside, register_sprite, spawn_bullet, spawn_garbage,
+    update_bullets, update_garbage,
+)
+from explosion import ExplosionPool, update_explosions
+from game_scenario import SCENARIO_PATH, load_scenario
+from input_events import InputQueue
+from obstacles import Obstacle, ObstacleIndex
 from physics import update_speed
+from quality_governor import LOD_EVENT_BASE, QualityGovernor
+from renderer import BufferedCanvas
+from session_log import RecordingInputQueue, SessionRecorder
+from snapshots import SnapshotBuffer, SnapshotCanvas
+from star_field import StarField
+from tick_profiler import TickProfiler
+from tick_scheduler import TICK_RATE, TickScheduler
+from viewport import Viewport
 
 STAR_SYMBOLS = "+*.:"
 SKY_FILLING = 30
 SYMBOL_AREA = 25
 GARBAGE_COUNT = 6
-GARBAGE_COROTINES = []
-FIRE_COROTINES = []
-OBSTACLES = []
-OBSTACLES_IN_LAST_COLLISIONS = []
-YEAR = 1957
-YOU_CAN_FIRE = 2020
+GARBAGE = EntityStore()
+BULLETS = EntityStore()
+EXPLOSIONS = ExplosionPool()
+OBSTACLES = ObstacleIndex()
+OBSTACLES_IN_LAST_COLLISIONS = set()
+SCENARIO = load_scenario()
+YEAR = SCENARIO.first_year
 GAME_OVER = False
-
-
-def read_file(filename):
-    with open(filename, "r") as my_file:
-        file_content = my_file.read()
-    return file_content
-
-
-def get_frame_max_size(frames):
-    frames_sizes = [get_frame_size(frame) for frame in frames]
-    frame_max_size = max(frames_sizes, key=max)
-    return frame_max_size
+SHIP_ROW = SHIP_COLUMN = None
+STAR_FIELD = None
+# size of the window the restored world was saved in
+RESTORED_WINDOW_SIZE = None
+IS_CHECKPOINT_REQUESTED = False
+BULLET_SPRITE_NAME = "bullet"
+ROCKET_FRAMES = ["rocket_frame_1", "rocket_frame_2"]
+GARBAGE_FRAMES = ["trash_large", "trash_small", "trash_xl"]
+PROFILE_OVERLAY_TICS = 10
+SNAPSHOT_POLL_INTERVAL = 0.01
+
+PRIORITY_HUD = 0
+PRIORITY_STARS = 10
+PRIORITY_GARBAGE_SPAWN = 20
+PRIORITY_GARBAGE = 30
+PRIORITY_CONTROLS = 40
+PRIORITY_SHIP = 50
+PRIORITY_BULLETS = 60
+PRIORITY_YEAR = 70
+PRIORITY_PROFILE = 80
+
+
+def reset_game_state(year=None):
+    """Return module globals to the start of a new game, by default to the first year of the scenario."""
+    global YEAR, GAME_OVER, SHIP_ROW, SHIP_COLUMN, STAR_FIELD, RESTORED_WINDOW_SIZE, IS_CHECKPOINT_REQUESTED
+    YEAR = SCENARIO.first_year if year is None else year
+    GAME_OVER = False
+    SHIP_ROW = SHIP_COLUMN = STAR_FIELD = RESTORED_WINDOW_SIZE = None
+    IS_CHECKPOINT_REQUESTED = False
+    GARBAGE.clear()
+    BULLETS.clear()
+    EXPLOSIONS.clear()
+    OBSTACLES.clear()
+    OBSTACLES_IN_LAST_COLLISIONS.clear()
+
+
+def save_world(path, canvas):
+    """Write the whole game world to a checkpoint file."""
+    sprite_names = {id(sprite): name for name, sprite in ASSETS.items()}
+    sprite_names[id(BULLET_SPRITE)] = BULLET_SPRITE_NAME
+    rows, columns = canvas.getmaxyx()
+    write_checkpoint(path, {
+        "year": YEAR,
+        "game_over": GAME_OVER,
+        "rows": rows,
+        "columns": columns,
+        "ship_row": SHIP_ROW,
+        "ship_column": SHIP_COLUMN,
+        "next_uid": OBSTACLES.next_uid,
+        "rng_state": random.getstate(),
+        "sprite_names": [sprite_names[id(sprite)] for sprite in SPRITES],
+        "star_field": STAR_FIELD,
+        "garbage": GARBAGE,
+        "bullets": BULLETS,
+        "explosions": EXPLOSIONS,
+        "collided_uids": OBSTACLES_IN_LAST_COLLISIONS,
+    })
+
+
+def restore_world(path):
+    """Replace the game world with the one from a checkpoint file, the next draw() goes on from it.
+
+    Return the checkpoint dict, its rows and columns are the size of the window it was saved in.
+    """
+    global YEAR, GAME_OVER, SHIP_ROW, SHIP_COLUMN, STAR_FIELD, RESTORED_WINDOW_SIZE, GARBAGE, BULLETS, EXPLOSIONS
+    world = read_checkpoint(path)
+    reset_game_state(world["year"])
+    GAME_OVER = world["game_over"]
+    RESTORED_WINDOW_SIZE = (world["rows"], world["columns"])
+    SHIP_ROW, SHIP_COLUMN = world["ship_row"], world["ship_column"]
+    STAR_FIELD = world["star_field"]
+    random.setstate(world["rng_state"])
+
+    # sprite ids of this process differ from the ids of the saving one
+    sprites = [BULLET_SPRITE if name == BULLET_SPRITE_NAME else get_asset(name) for name in world["sprite_names"]]
+    sprite_ids = [register_sprite(sprite) for sprite in sprites]
+    GARBAGE, BULLETS, EXPLOSIONS = world["garbage"], world["bullets"], world["explosions"]
+    for store in (GARBAGE, BULLETS):
+        store.sprite_ids[:] = array("H", [sprite_ids[sprite_id] for sprite_id in store.sprite_ids])
+
+    for index in range(len(GARBAGE)):
+        sprite = SPRITES[GARBAGE.sprite_ids[index]]
+        OBSTACLES.insert(Obstacle(
+            GARBAGE.rows[index], GARBAGE.columns[index], sprite.rows, sprite.columns, GARBAGE.uids[index], sprite,
+        ))
+    OBSTACLES.next_uid = world["next_uid"]
+    OBSTACLES_IN_LAST_COLLISIONS.update(world["collided_uids"])
+    return world
+
+
+def set_scenario(scenario):
+    """Play the game by another timeline from its first year."""
+    global SCENARIO
+    SCENARIO = scenario
+    reset_game_state()
 
 
 def apply_ship_acceleration(rows_direction, columns_direction):
-    if rows_direction == -1:
-        row_speed, column_speed = update_speed(rows_direction, columns_direction, -1, 0)
-        rows_direction = rows_direction + row_speed
-    if rows_direction == 0:
-        row_speed, column_speed = update_speed(rows_direction, columns_direction, 0, 0)
-        rows_direction = rows_direction + row_speed
-    if rows_direction == 1:
-        row_speed, column_speed = update_speed(rows_direction, columns_direction, 1, 0)
-        rows_direction = rows_direction + row_speed
-    if columns_direction == -1:
-        row_speed, column_speed = update_speed(rows_direction, columns_direction, 0, -1)
-        columns_direction = columns_direction + column_speed
-    if columns_direction == 0:
-        row_speed, column_speed = update_speed(rows_direction, columns_direction, 0, 0)
-        columns_direction = columns_direction + column_speed
-    if columns_direction == 1:
-        row_speed, column_speed = update_speed(rows_direction, columns_direction, 0, 1)
-        columns_direction = columns_direction + column_speed
-    return rows_direction, columns_direction
+    row_speed, column_speed = update_speed(rows_direction, columns_direction, rows_direction, columns_direction)
+    return rows_direction + row_speed, columns_direction + column_speed
 
 
 def distribute_stars_in_sky(canvas, star_symbol, sky_filling):
@@ -75,265 +162,565 @@ def distribute_stars_in_sky(canvas, star_symbol, sky_filling):
     return stars_on_sky
 
 
-def check_frame_crossing_border(canvas, frame_row, frame_column, columns_direction, rows_direction, frames):
-    frame_height, frame_width = get_frame_max_size(frames)
-    window_height, window_width = canvas.getmaxyx()
+def add_stars_to_new_area(star_field, viewport, previous_rows, previous_columns):
+    """Fill the part of the sky added by resize with stars as dense as on the rest of it.
+
+    Stars are put to random cells of the one or two added strips. A narrow strip is owed a fraction
+    of a star, it is carried over to the next resize.
+    """
+    added_area = viewport.rows * viewport.columns - min(viewport.rows, previous_rows) * min(viewport.columns, previous_columns)
+    star_field.unplaced_stars += added_area * SKY_FILLING / 100 / SYMBOL_AREA
+
+    # strips as first and last row, first and last column, stars take the same cells as in distribute_stars_in_sky
+    last_row, last_column = viewport.rows - 2, viewport.columns - 2
+    previous_last_row, previous_last_column = previous_rows - 2, previous_columns - 2
+    strips = [
+        (2, last_row, max(2, previous_last_column + 1), last_column),
+        (max(2, previous_last_row + 1), last_row, 2, min(last_column, previous_last_column)),
+    ]
+    strips = [strip for strip in strips if strip[0] <= strip[1] and strip[2] <= strip[3]]
+    if not strips:
+        return
+    strip_areas = [
+        (strip_last_row - first_row + 1) * (strip_last_column - first_column + 1)
+        for first_row, strip_last_row, first_column, strip_last_column in strips
+    ]
+
+    stars_number = int(star_field.unplaced_stars)
+    star_field.unplaced_stars -= stars_number
+    for _ in range(stars_number):
+        first_row, strip_last_row, first_column, strip_last_column = random.choices(strips, strip_areas)[0]
+        star_row = random.randint(first_row, strip_last_row)
+        star_column = random.randint(first_column, strip_last_column)
+        star_field.add_star(star_row, star_column, random.choice(STAR_SYMBOLS))
+
+
+def resize_game(canvas, viewport, star_field):
+    """Fit the game to the window after KEY_RESIZE without restarting it. Return True when the size has changed."""
+    canvas.update_size()
+    previous_size = viewport.update()
+    if previous_size is None:
+        return False
+    previous_rows, previous_columns = previous_size
+
+    # the old border is inside the bigger window now
+    if previous_rows < viewport.rows:
+        canvas.addstr(previous_rows - 1, 1, " " * (min(previous_columns, viewport.columns) - 2))
+    if previous_columns < viewport.columns:
+        for row in range(1, min(previous_rows, viewport.rows) - 1):
+            canvas.addstr(row, previous_columns - 1, " ")
+
+    star_field.remove_stars_outside(viewport.rows - 2, viewport.columns - 2)
+    add_stars_to_new_area(star_field, viewport, previous_rows, previous_columns)
+    clamp_garbage(canvas, GARBAGE, OBSTACLES, viewport.garbage_max_column)
+    kill_outside(BULLETS, viewport.rows, viewport.columns)
+    return True
+
+
+def check_frame_crossing_border(viewport, frame_row, frame_column, columns_direction, rows_direction):
     if frame_column <= 1:
         frame_column = 2
         return frame_row, frame_column
 
-    if frame_column >= window_width - frame_width - 1:
-        frame_column = window_width - frame_width - 2
+    if frame_column >= viewport.ship_max_column + 1:
+        frame_column = viewport.ship_max_column
         return frame_row, frame_column
 
     if frame_row <= 1:
         frame_row = 2
         return frame_row, frame_column
 
-    if frame_row >= window_height - frame_height - 1:
-        frame_row = window_height - frame_height - 2
+    if frame_row >= viewport.ship_max_row + 1:
+        frame_row = viewport.ship_max_row
         return frame_row, frame_column
 
     return frame_row + rows_direction, frame_column + columns_direction
 
 
-def show_gameover(canvas):
-    window_height, window_width = canvas.getmaxyx()
-    game_over_text = read_file("frames/game_over.txt")
+def show_gameover(canvas, viewport):
+    game_over_text = get_asset("game_over")
     frame_height, frame_width = get_frame_size(game_over_text)
-    game_over_column = (window_height - frame_height) // 2
-    game_over_row = (window_width - frame_width) // 2
+    game_over_column = (viewport.rows - frame_height) // 2
+    game_over_row = (viewport.columns - frame_width) // 2
     draw_frame(canvas, game_over_column, game_over_row, game_over_text)
 
 
-async def sleep(tics=1):
-    for _ in range(tics):
-        await asyncio.sleep(0)
-
-
-async def fly_garbage(canvas, column, garbage_frame, speed=0.5):
-    """Animate garbage, flying from top to bottom. Сolumn position will stay same, as specified on start."""
-    rows_number, columns_number = canvas.getmaxyx()
-
-    column = max(column, 0)
-    column = min(column, columns_number - 1)
-
-    row = 0
-
-    while row < rows_number:
-        draw_frame(canvas, row, column, garbage_frame)
-        frame_height, frame_width = get_frame_size(garbage_frame)
-        obstacle = Obstacle(row, column, frame_height, frame_width)
-        OBSTACLES.append(obstacle)
-        await asyncio.sleep(0)
-        if obstacle in OBSTACLES_IN_LAST_COLLISIONS:
-            OBSTACLES_IN_LAST_COLLISIONS.remove(obstacle)
-            OBSTACLES.remove(obstacle)
-            draw_frame(canvas, row, column, garbage_frame, negative=True)
-            await explode(canvas, row, column)
-            return
-        draw_frame(canvas, row, column, garbage_frame, negative=True)
-        OBSTACLES.remove(obstacle)
-        row += speed
-
+def is_garbage_capped(governor):
+    max_garbage = governor.settings["max_garbage"]
+    return max_garbage is not None and len(GARBAGE) >= max_garbage
 
-async def fire(canvas, start_row, start_column, rows_speed=-0.3, columns_speed=0):
-    """Display animation of gun shot, direction and speed can be specified."""
 
-    row, column = start_row, start_column
-
-    canvas.addstr(round(row), round(column), "*")
-    await asyncio.sleep(0)
-
-    canvas.addstr(round(row), round(column), "O")
-    await asyncio.sleep(0)
-    canvas.addstr(round(row), round(column), " ")
-
-    row += rows_speed
-    column += columns_speed
-
-    symbol = "-" if columns_speed else "|"
-
-    rows, columns = canvas.getmaxyx()
-    max_row, max_column = rows - 1, columns - 1
-
-    curses.beep()
-
-    while 0 < row < max_row and 0 < column < max_column:
-        canvas.addstr(round(row), round(column), symbol)
-        for obstacle in OBSTACLES:
-            if obstacle.has_collision(round(row), round(column)):
-                OBSTACLES_IN_LAST_COLLISIONS.append(obstacle)
-                canvas.addstr(round(row), round(column), " ")
-                return
-        await asyncio.sleep(0)
-        canvas.addstr(round(row), round(column), " ")
-        row += rows_speed
-        column += columns_speed
-
-
-async def create_garbage(canvas):
-    window_height, window_width = canvas.getmaxyx()
-    garbage_frame_files = ["frames/trash_large.txt", "frames/trash_small.txt", "frames/trash_xl.txt"]
-    garbage_frames = [read_file(garbage_frame) for garbage_frame in garbage_frame_files]
-    frame_height, frame_width = get_frame_max_size(garbage_frames)
-    garbage_column = random.randint(2, window_width - frame_width - 2)
+def create_garbage(viewport):
+    garbage_frames = [get_asset(garbage_frame) for garbage_frame in GARBAGE_FRAMES]
+    garbage_column = random.randint(2, viewport.garbage_max_column)
     garbage_frame = random.choice(garbage_frames)
-    GARBAGE_COROTINES.append(fly_garbage(canvas, garbage_column, garbage_frame))
-    await asyncio.sleep(0)
+    spawn_garbage(GARBAGE, OBSTACLES, garbage_column, garbage_frame, viewport.columns)
 
 
-async def animate_spaceship(canvas, ship_row, ship_column, frames):
-    for frame in frames:
-        draw_frame(canvas, ship_row, ship_column, frame, negative=True)
-    await asyncio.sleep(0)
-
+async def animate_spaceship(canvas, viewport, ship_row, ship_column, frames):
     for frame in cycle(frames):
-        for obstacle in OBSTACLES:
-            if obstacle.has_collision(ship_row, ship_column):
-                while True:
-                    global GAME_OVER
-                    GAME_OVER = True
-                    show_gameover(canvas)
-                    await asyncio.sleep(0)
+        if OBSTACLES.query_sprite(frame, ship_row, ship_column):
+            while True:
+                global GAME_OVER
+                GAME_OVER = True
+                show_gameover(canvas, viewport)
+                await sleep()
         draw_frame(canvas, ship_row, ship_column, frame)
-        await asyncio.sleep(0)
+        await sleep()
         draw_frame(canvas, ship_row, ship_column, frame)
-        await asyncio.sleep(0)
+        await sleep()
         draw_frame(canvas, ship_row, ship_column, frame, negative=True)
 
 
-async def blink(canvas, row, column, symbol="*"):
-    for _ in range(random.randint(1, 10)):
-        await sleep(random.randint(1, 10))
-
-    while True:
-        canvas.addstr(row, column, symbol, curses.A_DIM)
-        await asyncio.sleep(0)
-
-        await sleep(20)
-
-        canvas.addstr(row, column, symbol, curses.A_NORMAL)
-        await asyncio.sleep(0)
+async def control_spaceship(canvas, viewport, star_field, coroutines, input_queue, frames, profiler, governor):
+    """Apply every key pressed since the previous tic: move the ship, shoot, toggle the profiler line.
 
-        await sleep(3)
+    Moved ship gets a new animation task. Level of detail changes and window resizes come in the same queue.
+    """
+    global SHIP_ROW, SHIP_COLUMN, IS_CHECKPOINT_REQUESTED
+    if SHIP_ROW is None:
+        ship_row, ship_column = viewport.rows // 2, viewport.columns // 2
+    else:
+        ship_row, ship_column = viewport.clamp_ship(SHIP_ROW, SHIP_COLUMN)
+    ship_task = coroutines.spawn(
+        animate_spaceship(canvas, viewport, ship_row, ship_column, frames), PRIORITY_SHIP, "ship"
+    )
 
-        canvas.addstr(row, column, symbol, curses.A_BOLD)
-        await asyncio.sleep(0)
-
-        await sleep(5)
+    while True:
+        for key_code in input_queue.pop_keys():
+            if key_code >= LOD_EVENT_BASE:
+                governor.set_level(key_code - LOD_EVENT_BASE)
+                continue
+            if key_code == PROFILER_KEY_CODE:
+                profiler.toggle_overlay()
+                continue
+            if key_code == CHECKPOINT_KEY_CODE:
+                # the world is saved whole at the end of the tic
+                IS_CHECKPOINT_REQUESTED = True
+                continue
+            if key_code == curses.KEY_RESIZE:
+                if not resize_game(canvas, viewport, star_field):
+                    continue
+                if not GAME_OVER:
+                    coroutines.cancel(ship_task)
+                    for frame in frames:
+                        draw_frame(canvas, ship_row, ship_column, frame, negative=True)
+                # shots start from the ship, so it is kept inside the window after the game is over too
+                ship_row, ship_column = viewport.clamp_ship(ship_row, ship_column)
+                if not GAME_OVER:
+                    ship_task = coroutines.spawn(
+                        animate_spaceship(canvas, viewport, ship_row, ship_column, frames), PRIORITY_SHIP, "ship"
+                    )
+                continue
+
+            rows_direction, columns_direction, space_pressed = read_key_controls(key_code)
+            if (rows_direction or columns_direction) and not GAME_OVER:
+                rows_direction, columns_direction = apply_ship_acceleration(rows_direction, columns_direction)
+
+                coroutines.cancel(ship_task)
+                for frame in frames:
+                    draw_frame(canvas, ship_row, ship_column, frame, negative=True)
+                ship_row, ship_column = check_frame_crossing_border(
+                    viewport, ship_row, ship_column, columns_direction, rows_direction
+                )
+                ship_task = coroutines.spawn(
+                    animate_spaceship(canvas, viewport, ship_row, ship_column, frames), PRIORITY_SHIP, "ship"
+                )
+
+            if space_pressed and SCENARIO.is_unlocked("fire", YEAR):
+                spawn_bullet(BULLETS, ship_row, ship_column + 2)
+        SHIP_ROW, SHIP_COLUMN = ship_row, ship_column
+        await sleep()
+
+
+async def animate_garbage(canvas, viewport, governor):
+    """Move garbage and explosions, every piece gone off the window or blown up is replaced with a new one."""
+    while True:
+        gone_count = update_garbage(canvas, GARBAGE, OBSTACLES, OBSTACLES_IN_LAST_COLLISIONS, EXPLOSIONS)
+        gone_count += update_explosions(canvas, EXPLOSIONS, governor.settings["explosion_frame_step"])
+        for _ in range(gone_count):
+            if not is_garbage_capped(governor):
+                create_garbage(viewport)
+        await sleep()
 
-        canvas.addstr(row, column, symbol, curses.A_NORMAL)
-        await asyncio.sleep(0)
 
-        await sleep(3)
+async def fill_orbit_with_garbage(viewport, governor):
+    while True:
+        tics = SCENARIO.get_garbage_delay_tics(YEAR)
+        if tics:
+            if not is_garbage_capped(governor):
+                create_garbage(viewport)
+            await sleep(tics)
+        else:
+            await sleep()
 
 
-async def animate_garbage(canvas):
+async def animate_bullets(canvas):
     while True:
-        for coroutine_index in GARBAGE_COROTINES:
-            try:
-                coroutine_index.send(None)
-            except StopIteration:
-                GARBAGE_COROTINES.remove(coroutine_index)
-                garbage_fill_corotine = create_garbage(canvas)
-                garbage_fill_corotine.send(None)
-
-        await asyncio.sleep(0)
+        update_bullets(canvas, BULLETS, OBSTACLES, OBSTACLES_IN_LAST_COLLISIONS)
+        await sleep()
 
 
-async def fill_orbit_with_garbage(canvas):
+async def blink_stars(canvas, star_field, governor):
     while True:
-        tics = get_garbage_delay_tics(YEAR)
-        if tics:
-            garbage_fill_corotine = create_garbage(canvas)
-            garbage_fill_corotine.send(None)
-            await sleep(tics)
-        await asyncio.sleep(0)
+        star_field.twinkling_step = governor.settings["stars_twinkling_step"]
+        star_field.blink(canvas)
+        await sleep(governor.settings["blink_interval"])
 
 
-async def do_fireshot(canvas, ship_row, ship_column, fireshot):
-    if fireshot:
-        FIRE_COROTINES.append(fire(canvas, ship_row, ship_column))
+async def show_year(information_window, governor):
+    """Draw the year line when the year or level of detail changes, or when something has drawn over it."""
+    era = SCENARIO.get_era(YEAR)
+    shown_year = shown_level = None
+    lod = year_text = ""
     while True:
-        for fire_coroutine in FIRE_COROTINES:
-            try:
-                fire_coroutine.send(None)
-            except StopIteration:
-                FIRE_COROTINES.remove(fire_coroutine)
-        await asyncio.sleep(0)
+        if YEAR != shown_year or governor.level != shown_level:
+            if YEAR not in era:
+                era = SCENARIO.get_era(YEAR)
+            shown_year, shown_level = YEAR, governor.level
+            shown_lod, lod = lod, f" LOD:{ governor.level }." if governor.level else ""
+            year_text = f" Year:{ YEAR }.{ lod } Interesting facts: { era.phrase }"
+            # the line gets shorter when full detail is back, clear the tail left from the longer one
+            year_text = year_text.ljust(len(year_text) + len(shown_lod) - len(lod))
+            encoded_year_text = year_text.encode()
+        # garbage, explosions and shots fly over the line
+        if information_window.instr(1, 1, len(year_text)) != encoded_year_text:
+            information_window.addstr(1, 1, year_text)
+        await sleep()
+
+
+async def show_profile(information_window, profiler):
+    """Show tic phase timings under the year line while the profiler overlay is on."""
+    text = ""
+    while True:
+        if profiler.is_overlay_shown:
+            if not text or profiler.tics_passed % PROFILE_OVERLAY_TICS == 0:
+                _, columns_number = information_window.getmaxyx()
+                text = profiler.get_overlay_text()[:columns_number - 2].ljust(len(text))
+            information_window.addstr(2, 1, text)
+        elif text:
+            information_window.addstr(2, 1, " " * len(text))
+            text = ""
+        await sleep()
 
 
 async def increase_year(canvas):
     while True:
-        await sleep(15)
+        await sleep(SCENARIO.year_tics)
         global YEAR
-        if YEAR <= 2021:
+        if YEAR < SCENARIO.last_year:
             YEAR += 1
 
 
-def draw(canvas):
-    rocket_frame_files = ["frames/rocket_frame_1.txt", "frames/rocket_frame_2.txt"]
-    rocket_frames = [read_file(rocket_frame) for rocket_frame in rocket_frame_files]
+def start_game(canvas, input_queue=None, profiler=None, governor=None, checkpoint_path=None):
+    """Prepare canvas and spawn game coroutines. Keys are read from canvas unless input_queue is given.
 
-    curses.curs_set(False)
+    The profiler times coroutines, border and refresh of every tic while it is enabled.
+    The governor lowers level of detail when tics go over their time budget.
+    With checkpoint_path the checkpoint key saves the world to it, a world restored before is played on.
+
+    Return play_tick(render) function playing one tic and the input queue of the game.
+    """
+    global STAR_FIELD, RESTORED_WINDOW_SIZE
+    rocket_frames = [get_asset(rocket_frame) for rocket_frame in ROCKET_FRAMES]
+
+    try:
+        curses.curs_set(False)
+    except curses.error:
+        # there is no terminal behind a virtual canvas
+        pass
     canvas.nodelay(True)
     canvas.border()
     information_window = canvas.derwin(0, 0)
 
-    stars_in_sky = distribute_stars_in_sky(canvas, STAR_SYMBOLS, SKY_FILLING)
-    star_coroutines = [
-        blink(canvas, star["star_row"], star["star_column"], star["star_symbol"]) for star in stars_in_sky
-    ]
-
-    window_height, window_width = canvas.getmaxyx()
-
-    start_row = int(window_height // 2)
-    start_column = int(window_width // 2)
-
-    ship_column = start_column
-    ship_row = start_row
-    ship_coroutine = animate_spaceship(canvas, ship_row, ship_column, rocket_frames)
-
-    fill_garbage_corotine = fill_orbit_with_garbage(canvas)
-    garbage_fly_corotine = animate_garbage(canvas)
-
-    year_corotine = increase_year(canvas)
-
-    while True:
-        information_window.addstr(1, 1, f" Year:{ YEAR }. Interesting facts: { PHRASES.get(YEAR,'') }")
-
-        for star_coroutine in star_coroutines:
-            star_coroutine.send(None)
-
-        fill_garbage_corotine.send(None)
-        garbage_fly_corotine.send(None)
-
-        rows_direction, columns_direction, space_pressed = read_controls(canvas)
-        if (rows_direction or columns_direction) and not GAME_OVER:
-            rows_direction, columns_direction = apply_ship_acceleration(rows_direction, columns_direction)
+    viewport = Viewport(canvas, rocket_frames, [get_asset(garbage_frame) for garbage_frame in GARBAGE_FRAMES])
+    if STAR_FIELD is None:
+        stars_in_sky = distribute_stars_in_sky(canvas, STAR_SYMBOLS, SKY_FILLING)
+        STAR_FIELD = StarField.from_stars(stars_in_sky)
+    else:
+        # restored world, it may come from a window of another size
+        STAR_FIELD.remove_stars_outside(viewport.rows - 2, viewport.columns - 2)
+        if RESTORED_WINDOW_SIZE is not None:
+            add_stars_to_new_area(STAR_FIELD, viewport, *RESTORED_WINDOW_SIZE)
+            RESTORED_WINDOW_SIZE = None
+        STAR_FIELD.draw(canvas)
+        clamp_garbage(canvas, GARBAGE, OBSTACLES, viewport.garbage_max_column)
+        kill_outside(BULLETS, viewport.rows, viewport.columns)
+    star_field = STAR_FIELD
+
+    if input_queue is None:
+        input_queue = InputQueue(canvas.getch, getattr(canvas, "input_fileno", None))
+
+    if profiler is None:
+        profiler = TickProfiler()
+    if governor is None:
+        governor = QualityGovernor()
+
+    coroutines = CoroutineScheduler(profiler)
+    coroutines.spawn(show_year(information_window, governor), PRIORITY_HUD, "hud")
+    coroutines.spawn(show_profile(information_window, profiler), PRIORITY_PROFILE, "profile")
+    coroutines.spawn(blink_stars(canvas, star_field, governor), PRIORITY_STARS, "stars")
+    coroutines.spawn(fill_orbit_with_garbage(viewport, governor), PRIORITY_GARBAGE_SPAWN, "garbage_spawn")
+    coroutines.spawn(animate_garbage(canvas, viewport, governor), PRIORITY_GARBAGE, "garbage")
+    coroutines.spawn(
+        control_spaceship(canvas, viewport, star_field, coroutines, input_queue, rocket_frames, profiler, governor),
+        PRIORITY_CONTROLS,
+        "controls",
+    )
+    coroutines.spawn(animate_bullets(canvas), PRIORITY_BULLETS, "fire")
+    coroutines.spawn(increase_year(canvas), PRIORITY_YEAR, "year")
+
+    def play_profiled_tick(render):
+        clock = profiler.clock
+        coroutines.run_tick()
+        ring_bell()
+        if render:
+            phase_start = clock()
+            canvas.border()
+            profiler.add("border", clock() - phase_start)
+            phase_start = clock()
+            canvas.refresh()
+            profiler.add("refresh", clock() - phase_start)
+            input_queue.mark_rendered()
+        latency = input_queue.get_latency_stats()
+        profiler.end_tick(
+            render,
+            lod=governor.level,
+            explosion_pool=round(EXPLOSIONS.get_fill(), 2),
+            input_p50_ms=latency["p50_ms"],
+            input_max_ms=latency["max_ms"],
+        )
 
-            ship_coroutine = animate_spaceship(canvas, ship_row, ship_column, rocket_frames)
-            ship_coroutine.send(None)
-            ship_row, ship_column = check_frame_crossing_border(
-                canvas, ship_row, ship_column, columns_direction, rows_direction, rocket_frames
+    def play_tick(render=True):
+        tick_start = governor.clock()
+        if profiler.is_enabled:
+            play_profiled_tick(render)
+        else:
+            coroutines.run_tick()
+            # many explosions and shots in one tic ring the bell once
+            ring_bell()
+            # catch-up tics only move the world, the terminal is updated by the next rendered tic
+            if render:
+                canvas.border()
+                canvas.refresh()
+                input_queue.mark_rendered()
+
+        if governor.is_enabled:
+            level = governor.observe(governor.clock() - tick_start)
+            if level is not None:
+                input_queue.push(LOD_EVENT_BASE + level)
+
+        global IS_CHECKPOINT_REQUESTED
+        if IS_CHECKPOINT_REQUESTED:
+            IS_CHECKPOINT_REQUESTED = False
+            if checkpoint_path:
+                save_world(checkpoint_path, canvas)
+
+    return play_tick, input_queue
+
+
+def draw(canvas, tics=None, tick_rate=TICK_RATE, input_queue=None, profiler=None, checkpoint_path=None):
+    """Run the game on canvas: a curses window or a VirtualCanvas.
+
+    tics limits the number of simulation tics (None — play forever),
+    tick_rate is a number of tics per second, 0 runs the game at full speed
+    and keeps full level of detail.
+    """
+    play_tick, input_queue = start_game(canvas, input_queue, profiler, QualityGovernor(tick_rate), checkpoint_path)
+    TickScheduler(tick_rate, sleep=input_queue.wait).run(play_tick, tics)
+
+
+async def draw_async(canvas, tics=None, tick_rate=TICK_RATE, input_queue=None, profiler=None, checkpoint_path=None):
+    """Same as draw(), but waits between tics on the asyncio event loop shared with other tasks."""
+    play_tick, input_queue = start_game(canvas, input_queue, profiler, QualityGovernor(tick_rate), checkpoint_path)
+    if input_queue.fileno is None:
+        await TickScheduler(tick_rate).run_async(play_tick, tics)
+        return
+
+    loop = asyncio.get_running_loop()
+    loop.add_reader(input_queue.fileno, input_queue.poll)
+    try:
+        await TickScheduler(tick_rate).run_async(play_tick, tics)
+    finally:
+        loop.remove_reader(input_queue.fileno)
+
+
+def play_in_terminal(
+    window, tick_rate=TICK_RATE, use_asyncio=False, record_path=None, profile_log_path=None, checkpoint_path=None
+):
+    """Run the game in curses window, the terminal gets only the cells changed since the last frame.
+
+    With record_path the RNG seed, window size and keys of every tic are written to a session log,
+    with profile_log_path timings of every tic are written to a JSON lines file.
+    """
+    canvas = BufferedCanvas(window)
+    input_queue = recorder = None
+    profile_log = open(profile_log_path, "w") if profile_log_path else None
+    profiler = TickProfiler(profile_log)
+    if record_path:
+        seed = random.randrange(2 ** 64)
+        random.seed(seed)
+        recorder = SessionRecorder(record_path, seed, *canvas.getmaxyx())
+        input_queue = RecordingInputQueue(canvas.getch, canvas.input_fileno, recorder, canvas.window.getmaxyx)
+
+    try:
+        if use_asyncio:
+            asyncio.run(draw_async(
+                canvas, tick_rate=tick_rate, input_queue=input_queue, profiler=profiler, checkpoint_path=checkpoint_path
+            ))
+        else:
+            draw(
+                canvas, tick_rate=tick_rate, input_queue=input_queue, profiler=profiler, checkpoint_path=checkpoint_path
             )
-            ship_coroutine = animate_spaceship(canvas, ship_row, ship_column, rocket_frames)
-            ship_coroutine.send(None)
-
-        ship_coroutine.send(None)
-        canvas.border()
+    except KeyboardInterrupt:
+        if not recorder and not profile_log:
+            raise
+    finally:
+        if recorder:
+            recorder.close()
+        if profile_log:
+            profile_log.close()
+
+
+def run_simulation(
+    snapshots_name, rows, columns, key_receiver, tick_rate, assets_source, scenario_path, checkpoint_path, restore_path
+):
+    """Play the game in a worker process without terminal, every tic is published as a screen snapshot."""
+    # Ctrl+C goes to the whole process group, the worker is stopped by the terminal process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    load_assets(assets_source)
+    set_scenario(load_scenario(scenario_path))
+    if restore_path:
+        restore_world(restore_path)
+    snapshots = SnapshotBuffer.attach(snapshots_name, rows, columns)
+
+    def receive_key():
+        return key_receiver.recv() if key_receiver.poll() else -1
+
+    try:
+        draw(
+            SnapshotCanvas(snapshots),
+            tick_rate=tick_rate,
+            input_queue=InputQueue(receive_key, key_receiver.fileno()),
+            checkpoint_path=checkpoint_path,
+        )
+    except EOFError:
+        # the terminal process has closed the keys pipe
+        pass
+    finally:
+        snapshots.close()
+
+
+def play_split_in_terminal(
+    window, tick_rate=TICK_RATE, assets_source=FRAMES_DIR, scenario_path=SCENARIO_PATH, checkpoint_path=None,
+    restore_path=None,
+):
+    """Run the simulation in a worker process, this one only sends keys to it and shows its snapshots.
+
+    Slow terminal output no longer holds the simulation back, it just skips snapshots it had no time to show.
+    """
+    canvas = BufferedCanvas(window)
+    canvas.nodelay(True)
+    curses.curs_set(False)
+    rows, columns = canvas.getmaxyx()
+    snapshots = SnapshotBuffer.create(rows, columns)
+
+    # the worker must not inherit curses state of this process
+    context = multiprocessing.get_context("spawn")
+    key_receiver, key_sender = context.Pipe(duplex=False)
+    worker = context.Process(
+        target=run_simulation,
+        args=(
+            snapshots.name, rows, columns, key_receiver, tick_rate, assets_source, scenario_path, checkpoint_path,
+            restore_path,
+        ),
+        daemon=True,
+    )
+    worker.start()
+    key_receiver.close()
+
+    poll_interval = 1 / tick_rate / 2 if tick_rate else SNAPSHOT_POLL_INTERVAL
+    shown_tic = shown_bells = 0
+    try:
+        while worker.is_alive():
+            readable, _, _ = select.select([canvas.input_fileno], [], [], poll_interval)
+            while readable:
+                key_code = canvas.getch()
+                if key_code == -1:
+                    break
+                if key_code == curses.KEY_RESIZE:
+                    # the snapshots keep their size, the terminal shows the part of them that fits
+                    canvas.clip_to_window()
+                    continue
+                key_sender.send(key_code)
+
+            tic, bells = snapshots.read(canvas.chars, canvas.attrs, shown_tic)
+            if tic != shown_tic:
+                canvas.refresh()
+                shown_tic = tic
+            if bells != shown_bells:
+                beep()
+                ring_bell()
+                shown_bells = bells
+    finally:
+        key_sender.close()
+        worker.join(timeout=1)
+        if worker.is_alive():
+            worker.terminate()
+        snapshots.close()
+        snapshots.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Space game in terminal.")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE, help="simulation tics per second")
+    parser.add_argument("--asyncio", action="store_true", help="run the game on the asyncio event loop")
+    parser.add_argument("--record", metavar="LOG_PATH", help="record the session for replay.py, stop with Ctrl+C")
+    parser.add_argument("--profile-log", metavar="LOG_PATH", help="write timings of every tic as JSON lines")
+    parser.add_argument(
+        "--split", action="store_true", help="run the simulation in a separate process, this one only draws"
+    )
+    parser.add_argument("--assets", default=FRAMES_DIR, help="frames directory or packed frames bundle")
+    parser.add_argument("--scenario", default=SCENARIO_PATH, help="JSON timeline of years, garbage and facts")
+    parser.add_argument("--checkpoint", metavar="CHECKPOINT_PATH", help="save the world to the file with the s key")
+    parser.add_argument("--restore", metavar="CHECKPOINT_PATH", help="go on playing the world saved to the file")
+    args = parser.parse_args()
+    if args.restore and args.record:
+        parser.error("--restore can not be used with --record, the session would not replay from the start")
+    load_assets(args.assets)
+    try:
+        set_scenario(load_scenario(args.scenario))
+        if args.restore and args.split:
+            # the worker restores the world, here the file is only checked before curses takes the terminal
+            read_checkpoint(args.restore)
+        elif args.restore:
+            restore_world(args.restore)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
 
-        if YOU_CAN_FIRE <= YEAR:
-            fireshot_coroutine = do_fireshot(canvas, ship_row, ship_column + 2, space_pressed)
-            fireshot_coroutine.send(None)
+    curses.update_lines_cols()
+    if args.split:
+        if args.asyncio or args.record or args.profile_log:
+            parser.error("--split can not be used with --asyncio, --record or --profile-log")
+        curses.wrapper(
+            play_split_in_terminal,
+            tick_rate=args.tick_rate,
+            assets_source=args.assets,
+            scenario_path=args.scenario,
+            checkpoint_path=args.checkpoint,
+            restore_path=args.restore,
+        )
+        return
 
-        canvas.border()
-        canvas.refresh()
-        year_corotine.send(None)
-        time.sleep(0.1)
+    curses.wrapper(
+        play_in_terminal,
+        tick_rate=args.tick_rate,
+        use_asyncio=args.asyncio,
+        record_path=args.record,
+        profile_log_path=args.profile_log,
+        checkpoint_path=args.checkpoint,
+    )
 
 
 if __name__ == "__main__":
-    curses.update_lines_cols()
-    curses.wrapper(draw)
+    main()
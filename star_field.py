@@ -0,0 +1,102 @@
+import curses
+import random
+from array import array
+
+# every star repeats the same cycle: tic of the cycle when brightness changes and new brightness
+BLINK_PATTERN = (
+    (0, curses.A_DIM),
+    (21, curses.A_NORMAL),
+    (25, curses.A_BOLD),
+    (31, curses.A_NORMAL),
+)
+BLINK_PERIOD = 35
+
+
+def get_random_blink_offset():
+    """Tics a star waits before the first blink, same spread as random sleeps of the old blink() coroutine."""
+    return sum(random.randint(1, 10) for _ in range(random.randint(1, 10)))
+
+
+class StarField:
+    """All the stars of the sky, advanced in one step per tic.
+
+    Stars are kept in parallel arrays. Stars are grouped by the phase of their
+    blink cycle, so every tic only the stars changing brightness are visited and
+    redrawn, the rest of the sky costs nothing. With twinkling_step above 1 only
+    every twinkling_step-th star changes brightness, the others are drawn once
+    and keep that brightness.
+    """
+
+    def __init__(self):
+        self.rows = array("H")
+        self.columns = array("H")
+        self.symbols = array("I")
+        self.offsets = array("L")
+        self.attrs = array("L")
+        self.phase_groups = [array("L") for _ in range(BLINK_PERIOD)]
+        self.twinkling_step = 1
+        # fraction of a star owed to the sky by resizes, it is added with the next one
+        self.unplaced_stars = 0.0
+        self.tics_passed = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add_star(self, row, column, symbol, offset=None):
+        if offset is None:
+            offset = get_random_blink_offset()
+        star_index = len(self.rows)
+        self.rows.append(row)
+        self.columns.append(column)
+        self.symbols.append(ord(symbol))
+        self.offsets.append(self.tics_passed + offset)
+        self.attrs.append(curses.A_NORMAL)
+        self.phase_groups[(self.tics_passed + offset) % BLINK_PERIOD].append(star_index)
+
+    @classmethod
+    def from_stars(cls, stars):
+        """Build star field from the dicts returned by distribute_stars_in_sky."""
+        star_field = cls()
+        for star in stars:
+            star_field.add_star(star["star_row"], star["star_column"], star["star_symbol"])
+        return star_field
+
+    def remove_stars_outside(self, max_row, max_column):
+        """Drop stars with row or column above the limits, e.g. when the window gets smaller."""
+        kept = [
+            star_index for star_index in range(len(self))
+            if self.rows[star_index] <= max_row and self.columns[star_index] <= max_column
+        ]
+        if len(kept) == len(self):
+            return
+        for column in self.get_arrays():
+            column[:] = array(column.typecode, [column[star_index] for star_index in kept])
+        self.group_by_phase()
+
+    def get_arrays(self):
+        return self.rows, self.columns, self.symbols, self.offsets, self.attrs
+
+    def group_by_phase(self):
+        """Put every star to the group of its blink phase again, e.g. after the arrays are replaced."""
+        self.phase_groups = [array("L") for _ in range(BLINK_PERIOD)]
+        for star_index, offset in enumerate(self.offsets):
+            self.phase_groups[offset % BLINK_PERIOD].append(star_index)
+
+    def draw(self, canvas):
+        """Draw all stars with their current brightness, blink() redraws only the changed ones."""
+        for star_index in range(len(self)):
+            canvas.addstr(self.rows[star_index], self.columns[star_index], chr(self.symbols[star_index]), self.attrs[star_index])
+
+    def blink(self, canvas):
+        """Advance all stars by one tic, redraw only those whose brightness has changed."""
+        tic, twinkling_step = self.tics_passed, self.twinkling_step
+        for cycle_tic, attr in BLINK_PATTERN:
+            for star_index in self.phase_groups[(tic - cycle_tic) % BLINK_PERIOD]:
+                if tic < self.offsets[star_index] or self.attrs[star_index] == attr:
+                    continue
+                # the first draw shows the star, only its later twinkles are skipped
+                if twinkling_step > 1 and star_index % twinkling_step and tic > self.offsets[star_index]:
+                    continue
+                self.attrs[star_index] = attr
+                canvas.addstr(self.rows[star_index], self.columns[star_index], chr(self.symbols[star_index]), attr)
+        self.tics_passed += 1
@@ -0,0 +1,75 @@
+import json
+import time
+from collections import deque
+
+PROFILE_WINDOW = 256
+
+
+class TickProfiler:
+    """Time phases of every tic: coroutine groups, border and refresh.
+
+    Samples in nanoseconds are kept in rolling windows of the last tics per
+    phase, percentiles are taken from them. With log_file every tic is also
+    written to it as a JSON line. A disabled profiler is checked once per tic
+    and measures nothing.
+    """
+
+    def __init__(self, log_file=None, window=PROFILE_WINDOW, clock=time.perf_counter_ns):
+        self.log_file = log_file
+        self.clock = clock
+        self.window = window
+        self.is_overlay_shown = False
+        self.is_enabled = log_file is not None
+        self.samples = {}
+        self.tick_phases = {}
+        self.gauges = {}
+        self.tics_passed = 0
+
+    def toggle_overlay(self):
+        """Show or hide the timing line, timing runs while it is shown or the log is written."""
+        self.is_overlay_shown = not self.is_overlay_shown
+        self.is_enabled = self.is_overlay_shown or self.log_file is not None
+
+    def add(self, phase, duration_ns):
+        self.tick_phases[phase] = self.tick_phases.get(phase, 0) + duration_ns
+
+    def end_tick(self, render, **gauges):
+        """Move the phases measured in this tic to the rolling windows and the log with gauges of the game state."""
+        tick_phases = self.tick_phases
+        tick_phases["tick"] = sum(tick_phases.values())
+        for phase, duration_ns in tick_phases.items():
+            if phase not in self.samples:
+                self.samples[phase] = deque(maxlen=self.window)
+            self.samples[phase].append(duration_ns)
+
+        if self.log_file is not None:
+            record = {
+                "tic": self.tics_passed,
+                "render": render,
+                "phases_us": {phase: duration_ns // 1000 for phase, duration_ns in tick_phases.items()},
+                **gauges,
+            }
+            self.log_file.write(json.dumps(record) + "\n")
+
+        self.tick_phases = {}
+        self.gauges = gauges
+        self.tics_passed += 1
+
+    def get_stats(self):
+        """Return p50, p99 and max in microseconds of every phase over the rolling window."""
+        stats = {}
+        for phase, samples in self.samples.items():
+            sorted_samples = sorted(samples)
+            stats[phase] = {
+                "p50_us": sorted_samples[len(sorted_samples) // 2] // 1000,
+                "p99_us": sorted_samples[min(len(sorted_samples) - 1, len(sorted_samples) * 99 // 100)] // 1000,
+                "max_us": sorted_samples[-1] // 1000,
+            }
+        return stats
+
+    def get_overlay_text(self):
+        """Return gauges of the last tic and p50 of every phase in milliseconds, slowest first, in one line."""
+        stats = self.get_stats()
+        phases = sorted(stats, key=lambda phase: stats[phase]["p50_us"], reverse=True)
+        gauges = "".join(f"{name}:{value} " for name, value in self.gauges.items())
+        return gauges + " ".join(f"{phase}:{stats[phase]['p50_us'] / 1000:.2f}" for phase in phases) + " ms p50"
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+TICK_RATE = 10
+MAX_CATCH_UP_TICS = 5
+
+
+class TickScheduler:
+    """Run game tics at a fixed rate.
+
+    Every tic has a time budget of 1 / tick_rate seconds. The scheduler sleeps
+    only for the rest of the budget after a tic is done. When the game falls
+    behind, it runs extra simulation tics without rendering to catch up, but no
+    more than max_catch_up_tics in a row: the rest of the delay is dropped,
+    the game slows down instead of freezing.
+
+    tick_rate=0 disables pacing, tics run one after another at full speed.
+    """
+
+    def __init__(self, tick_rate=TICK_RATE, max_catch_up_tics=MAX_CATCH_UP_TICS, clock=time.perf_counter, sleep=time.sleep):
+        self.tick_rate = tick_rate
+        self.tick_duration = 1 / tick_rate if tick_rate else 0
+        self.max_catch_up_tics = max_catch_up_tics
+        self.clock = clock
+        self.sleep = sleep
+        self.tics_passed = 0
+        self.rendered_tics = 0
+        self.catch_up_tics = 0
+        self.dropped_tics = 0
+        self.last_tick_duration = 0
+
+    def run_tick(self, play_tick, render):
+        tick_start = self.clock()
+        play_tick(render)
+        self.last_tick_duration = self.clock() - tick_start
+        self.tics_passed += 1
+        if render:
+            self.rendered_tics += 1
+        else:
+            self.catch_up_tics += 1
+
+    def _play(self, play_tick, tics):
+        """Play tics, yield pauses in seconds to wait between them."""
+        next_tick_time = self.clock()
+
+        while tics is None or self.tics_passed < tics:
+            if not self.tick_duration:
+                self.run_tick(play_tick, render=True)
+                yield 0
+                continue
+
+            now = self.clock()
+            if now < next_tick_time:
+                yield next_tick_time - now
+                continue
+
+            lagging_tics = int((now - next_tick_time) // self.tick_duration)
+            if lagging_tics > self.max_catch_up_tics:
+                self.dropped_tics += lagging_tics - self.max_catch_up_tics
+                next_tick_time += (lagging_tics - self.max_catch_up_tics) * self.tick_duration
+                lagging_tics = self.max_catch_up_tics
+
+            for _ in range(lagging_tics):
+                if tics is not None and self.tics_passed >= tics - 1:
+                    break
+                self.run_tick(play_tick, render=False)
+                next_tick_time += self.tick_duration
+
+            self.run_tick(play_tick, render=True)
+            next_tick_time += self.tick_duration
+
+    def run(self, play_tick, tics=None):
+        """Call play_tick(render) once per tic, tics limits how many tics to play (None — forever)."""
+        for pause in self._play(play_tick, tics):
+            if pause:
+                self.sleep(pause)
+
+    async def run_async(self, play_tick, tics=None):
+        """Same as run(), but waits on the asyncio event loop, so other asyncio tasks run between tics."""
+        for pause in self._play(play_tick, tics):
+            await asyncio.sleep(pause)
@@ -0,0 +1,33 @@
+from curses_tools import get_frame_max_size
+
+
+class Viewport:
+    """Size of the game window and the position limits that depend on it.
+
+    Frame sizes are measured once and the limits are computed again only by
+    update(), when the window is resized, so the game reads plain attributes
+    instead of asking the window and measuring frames on every move.
+    """
+
+    def __init__(self, canvas, ship_frames, garbage_frames):
+        self.canvas = canvas
+        self.ship_rows, self.ship_columns = get_frame_max_size(ship_frames)
+        self.garbage_rows, self.garbage_columns = get_frame_max_size(garbage_frames)
+        self.rows = self.columns = 0
+        self.update()
+
+    def update(self):
+        """Read window size again. Return previous size when it has changed, else None."""
+        previous_size = self.rows, self.columns
+        self.rows, self.columns = self.canvas.getmaxyx()
+        # ship moves inside the border with one column or row gap, garbage spawns inside the border
+        self.ship_max_row = self.rows - self.ship_rows - 2
+        self.ship_max_column = self.columns - self.ship_columns - 2
+        self.garbage_max_column = self.columns - self.garbage_columns - 2
+        if previous_size == (self.rows, self.columns):
+            return None
+        return previous_size
+
+    def clamp_ship(self, ship_row, ship_column):
+        """Move ship position inside the window."""
+        return max(2, min(ship_row, self.ship_max_row)), max(2, min(ship_column, self.ship_max_column))
@@ -0,0 +1,206 @@
+import curses
+import sys
+from array import array
+from collections import deque
+
+BORDER_SYMBOLS = "|-+"
+# array("u") depends on the size of wchar_t and is deprecated, cells keep code points as 4-byte unsigned ints
+CODE_POINTS_ENCODING = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+
+
+def to_code_points(text):
+    return array("I", text.encode(CODE_POINTS_ENCODING))
+
+
+def from_code_points(code_points):
+    return code_points.tobytes().decode(CODE_POINTS_ENCODING)
+
+
+class VirtualCanvas:
+    """In-memory replacement for a curses window, runs the game without a terminal.
+
+    Code points of characters and attributes are kept in two flat arrays, one cell per screen position.
+    Sub-windows created with derwin() share the arrays of their parent and follow its resize().
+    """
+
+    def __init__(self, rows=24, columns=80, keys=()):
+        self.rows = rows
+        self.columns = columns
+        self.stride = columns
+        self.origin_row = 0
+        self.origin_column = 0
+        self.chars = array("I", [ord(" ")]) * (rows * columns)
+        self.attrs = array("L", [0]) * (rows * columns)
+        self.keys = deque(keys)
+        self.is_nodelay = False
+        self.refresh_count = 0
+        self.cursor = (0, 0)
+        self.subwindows = []
+        self.terminal_size = None
+
+    def getmaxyx(self):
+        return self.rows, self.columns
+
+    def getbegyx(self):
+        return self.origin_row, self.origin_column
+
+    def _cell_index(self, row, column):
+        return (self.origin_row + row) * self.stride + self.origin_column + column
+
+    def _write(self, row, column, text, attr):
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            raise curses.error(f"addwstr() returned ERR, position {row}, {column} is out of window")
+
+        if column + len(text) < self.columns or column + len(text) == self.columns and row < self.rows - 1:
+            index = self._cell_index(row, column)
+            self.chars[index:index + len(text)] = to_code_points(text)
+            self.attrs[index:index + len(text)] = array("L", [attr]) * len(text)
+            self.cursor = divmod(row * self.columns + column + len(text), self.columns)
+            return
+
+        # like curses, long strings wrap to next lines and writing the last cell is an error
+        position = row * self.columns + column
+        last_position = self.rows * self.columns
+        for symbol in text:
+            if position >= last_position:
+                raise curses.error("addwstr() returned ERR, text runs out of window")
+            cell_row, cell_column = divmod(position, self.columns)
+            index = self._cell_index(cell_row, cell_column)
+            self.chars[index] = ord(symbol)
+            self.attrs[index] = attr
+            position += 1
+
+        if position >= last_position:
+            self.cursor = (self.rows - 1, self.columns - 1)
+            raise curses.error("addwstr() returned ERR, cursor moved out of window")
+        self.cursor = divmod(position, self.columns)
+
+    def addstr(self, *args):
+        if isinstance(args[0], str):
+            (row, column), args = self.cursor, args
+        else:
+            row, column, *args = args
+        text, attr = args[0], args[1] if len(args) > 1 else curses.A_NORMAL
+        self._write(row, column, text, attr)
+
+    def addch(self, *args):
+        if len(args) < 3:
+            (row, column), args = self.cursor, args
+        else:
+            row, column, *args = args
+        symbol, attr = args[0], args[1] if len(args) > 1 else curses.A_NORMAL
+        if isinstance(symbol, int):
+            symbol = chr(symbol & 0xFF)
+        elif isinstance(symbol, bytes):
+            symbol = symbol.decode()
+        self._write(row, column, symbol, attr)
+
+    def inch(self, row, column):
+        index = self._cell_index(row, column)
+        return self.chars[index] | self.attrs[index]
+
+    def instr(self, row, column, n=None):
+        """Return characters from the position to the end of the row, at most n of them, as bytes like curses."""
+        length = self.columns - column if n is None else min(n, self.columns - column)
+        index = self._cell_index(row, column)
+        return from_code_points(self.chars[index:index + length]).encode()
+
+    def border(self):
+        vertical, horizontal, corner = BORDER_SYMBOLS
+        for row in range(1, self.rows - 1):
+            for column in (0, self.columns - 1):
+                index = self._cell_index(row, column)
+                self.chars[index], self.attrs[index] = ord(vertical), curses.A_NORMAL
+
+        border_line = to_code_points(corner + horizontal * (self.columns - 2) + corner)
+        for row in (0, self.rows - 1):
+            index = self._cell_index(row, 0)
+            self.chars[index:index + self.columns] = border_line
+            self.attrs[index:index + self.columns] = array("L", [curses.A_NORMAL]) * self.columns
+
+    def derwin(self, *args):
+        """Create sub-window with the curses signature derwin([nlines, ncols,] begin_y, begin_x)."""
+        if len(args) == 2:
+            nlines = ncols = 0
+            begin_row, begin_column = args
+        else:
+            nlines, ncols, begin_row, begin_column = args
+
+        window = VirtualCanvas.__new__(type(self))
+        window.origin_row = self.origin_row + begin_row
+        window.origin_column = self.origin_column + begin_column
+        window.chars = self.chars
+        window.attrs = self.attrs
+        window.keys = self.keys
+        window.is_nodelay = self.is_nodelay
+        window.refresh_count = 0
+        window.cursor = (0, 0)
+        window.subwindows = []
+        window.terminal_size = None
+        self.subwindows.append((window, nlines, ncols, begin_row, begin_column))
+        self._place_subwindow(window, nlines, ncols, begin_row, begin_column)
+        return window
+
+    def _place_subwindow(self, window, nlines, ncols, begin_row, begin_column):
+        window.rows = nlines or self.rows - begin_row
+        window.columns = ncols or self.columns - begin_column
+        window.stride = self.stride
+
+    def resize(self, rows, columns):
+        """Change size of the top-level window keeping the cells that are in both sizes.
+
+        Arrays are changed in place, so sub-windows keep sharing them, sub-windows without
+        explicit size stretch to the new edges.
+        """
+        chars = array("I", [ord(" ")]) * (rows * columns)
+        attrs = array("L", [0]) * (rows * columns)
+        kept_columns = min(columns, self.columns)
+        for row in range(min(rows, self.rows)):
+            old_index, new_index = row * self.columns, row * columns
+            chars[new_index:new_index + kept_columns] = self.chars[old_index:old_index + kept_columns]
+            attrs[new_index:new_index + kept_columns] = self.attrs[old_index:old_index + kept_columns]
+
+        self.chars[:] = chars
+        self.attrs[:] = attrs
+        self.rows, self.columns, self.stride = rows, columns, columns
+        self.cursor = (0, 0)
+        for window, nlines, ncols, begin_row, begin_column in self.subwindows:
+            self._place_subwindow(window, nlines, ncols, begin_row, begin_column)
+
+    def set_terminal_size(self, rows, columns):
+        """Pretend the terminal has been resized, the canvas follows on the next update_size()."""
+        self.terminal_size = (rows, columns)
+
+    def update_size(self):
+        """Pick up new terminal size after KEY_RESIZE, set with set_terminal_size()."""
+        if self.terminal_size is None or self.terminal_size == (self.rows, self.columns):
+            return
+        self.resize(*self.terminal_size)
+
+    def nodelay(self, flag):
+        self.is_nodelay = bool(flag)
+
+    def getch(self):
+        """Return next queued key code. There is nobody to wait for, so empty queue is always -1."""
+        if self.keys:
+            return self.keys.popleft()
+        return -1
+
+    def push_keys(self, *key_codes):
+        self.keys.extend(key_codes)
+
+    def refresh(self):
+        self.refresh_count += 1
+
+    def noutrefresh(self):
+        self.refresh_count += 1
+
+    def get_lines(self):
+        """Return window content as list of strings, one per row."""
+        return [
+            from_code_points(self.chars[self._cell_index(row, 0):self._cell_index(row, self.columns)])
+            for row in range(self.rows)
+        ]
+
+    def __str__(self):
+        return "\n".join(self.get_lines())